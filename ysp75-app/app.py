@@ -1,8 +1,19 @@
 import streamlit as st
 import os
+import numpy as np
 import pandas as pd
 import app_extensions  # הקובץ החדש עם הפונקציות המשופרות
-from search_history import save_search, show_search_history
+import scoring
+from search_history import log_search, current_session_id, show_search_history
+from search_index import NameIndex
+import ingest
+import data_cache
+from fit_index import load_or_build_fit_index
+from scouting import show_club_scouting
+from player_profiles import build_player_profiles
+from similarity import SimilarityIndex, show_similar_players
+from result_cache import RESULT_CACHE_DB, RESULT_CACHE_ON_DISK, ResultCache, row_hashes, scoring_signature
+import perf
 
 # הגדרת עמוד
 st.set_page_config(page_title="FstarVfootball", layout="wide")
@@ -12,26 +23,91 @@ css_path = os.path.join(os.path.dirname(__file__), "style.css")
 with open(css_path, "r", encoding="utf-8") as f:
     st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
 
-@st.cache_data
+# הטבלאות נטענות פעם אחת לתהליך ומשותפות בין הסשנים (cache_resource לא מעתיק אותן בכל קריאה) - אין לשנות אותן במקום
+@st.cache_resource
 def load_data():
-    path = os.path.join("ysp75-app", "players_simplified_2025.csv")
-    df = pd.read_csv(path)
+    # אם הורץ ingest.py - טוענים את העונה האחרונה מהדאטהסט המחולק, אחרת את קובץ ה-CSV
+    df = ingest.load_latest_season(ingest.PLAYERS_DATASET_DIR)
+    if df is None:
+        path = os.path.join("ysp75-app", "players_simplified_2025.csv")
+        df = data_cache.load_csv_cached(path, data_cache.PLAYER_DTYPES)
     df.columns = df.columns.str.strip()
     return df
 
-@st.cache_data
+# שורה אחת לכל שחקן (סכום כל הליגות/הקבוצות), כולל מדד YSP-75 הגולמי, לפי Player_ID
+@st.cache_resource
+def load_player_profiles():
+    return build_player_profiles(load_data())
+
+@st.cache_resource
+def load_player_lookup():
+    profiles = load_player_profiles()
+    return dict(zip(profiles["Display_Name"], profiles.index))
+
+@st.cache_resource
 def load_club_data():
     path = os.path.join("ysp75-app", "Updated_Club_Tactical_Dataset.csv")
-    df = pd.read_csv(path)
-    df.columns = df.columns.str.strip()
-    return df
+    return data_cache.load_csv_cached(path, data_cache.CLUB_DTYPES)
+
+# אינדקסי החיפוש נבנים פעם אחת לתהליך ומשותפים בין כל הסשנים
+SEARCH_RESULT_LIMIT = 100
+
+@st.cache_resource
+def load_player_index():
+    return NameIndex(load_player_profiles()["Display_Name"])
+
+@st.cache_resource
+def load_club_index():
+    return NameIndex(load_club_data()["Club"])
+
+# אינדקס ההתאמות (top-10 מועדונים לכל שחקן ולהפך) נשמר לדיסק ונבנה מחדש רק כשהנתונים או המשקלים משתנים
+@st.cache_resource
+def load_fit_index():
+    return load_or_build_fit_index(load_player_profiles().reset_index(), load_club_data(), k=10, key_column="Player_ID")
+
+# מטמון תוצאות לשחקן (YSP, top-10, התאמה למועדון) שמשותף לכל הסשנים ונשמר לדיסק.
+# הגרסה היא חתימת המשקלים וטבלת המועדונים, והמפתח כולל את חתימת שורת השחקן - כל שינוי בנתונים או בנוסחאות מייצר מפתח חדש
+@st.cache_resource
+def load_result_cache():
+    return ResultCache(scoring_signature(load_club_data()), path=RESULT_CACHE_DB if RESULT_CACHE_ON_DISK else None)
+
+@st.cache_resource
+def load_player_hashes():
+    return row_hashes(load_player_profiles())
+
+def player_result_key(kind, player_id, *rest):
+    return (kind, player_id, load_player_hashes()[player_id], *rest)
+
+# מטריצת מאפייני ה-90 המנורמלים לחיפוש "שחקנים דומים"
+@st.cache_resource
+def load_similarity_index():
+    return SimilarityIndex(load_player_profiles())
+
+# ingest.py --incremental כותב את השחקנים שהשתנו ומעדכן את אינדקס ההתאמות בדיסק;
+# כאן רק מזהים שהדאטהסט השתנה ומנקים את מה שנבנה מטבלת השחקנים, כך שייטען מחדש ברענון הבא
+PLAYER_LOADERS = (load_data, load_player_profiles, load_player_lookup, load_player_index, load_fit_index,
+                  load_player_hashes, load_similarity_index)
+
+@st.cache_resource
+def loaded_dataset_state():
+    return {"version": ingest.dataset_version(ingest.PLAYERS_DATASET_DIR)}
+
+def reload_if_dataset_changed():
+    state = loaded_dataset_state()
+    version = ingest.dataset_version(ingest.PLAYERS_DATASET_DIR)
+    if version != state["version"]:
+        for loader in PLAYER_LOADERS:
+            loader.clear()
+        state["version"] = version
+
+reload_if_dataset_changed()
 
 # -------------------------------
 # תפריט צד (sidebar) - עיצוב וסידור מודגש
 st.sidebar.header("בחר מצב:")
 mode = st.sidebar.radio(
     "",
-    ("חיפוש שחקנים", "היסטוריית חיפושים"),
+    ("חיפוש שחקנים", "סקאוטינג לפי מועדון", "היסטוריית חיפושים"),
     index=0,
     key="mode_select"
 )
@@ -47,94 +123,176 @@ st.sidebar.markdown(
     "</div>",
     unsafe_allow_html=True
 )
+
+# פאנל דיבאג (זמני שלבים ו-cProfile) מוצג רק עם ?debug=1 בכתובת
+debug_mode = st.query_params.get("debug") == "1"
+profile_rerun = debug_mode and st.sidebar.checkbox("הרץ cProfile על הרענון הזה", key="perf_profile")
+PAGE_KEYS = {"חיפוש שחקנים": "search", "סקאוטינג לפי מועדון": "scouting", "היסטוריית חיפושים": "history"}
 # -------------------------------
 
+# כל כמה שניות בודק ה-fragment אם החיפוש ברקע הסתיים; הסקריפט עצמו אף פעם לא ממתין לקישור
+LINK_POLL_SECONDS = 1
+
+def render_transfermarkt_link(player_name, link):
+    if link:
+        st.markdown(f"[עמוד {player_name} ב-Transfermarkt]({link})")
+        st.markdown("<sub>קישור דרך מנוע החיפוש DuckDuckGo עם fallback לגוגל</sub>", unsafe_allow_html=True)
+    else:
+        st.warning("לא נמצא קישור אוטומטי לעמוד הטרנספרמרקט של השחקן.")
+
+@st.fragment(run_every=LINK_POLL_SECONDS)
+def poll_transfermarkt_link(player_name, link_future):
+    if not link_future.done():
+        st.caption("מחפש קישור לעמוד הטרנספרמרקט...")
+        return
+    # הקישור נשמר בסשן (גם כשהחיפוש נכשל ולא נשמר במטמון) ורענון מלא מציג אותו בלי ה-fragment, כך שהבדיקה נעצרת
+    st.session_state[f"transfermarkt_link_{player_name}"] = link_future.result()
+    st.rerun()
+
+def show_transfermarkt_link(player_name):
+    link_key = f"transfermarkt_link_{player_name}"
+    with perf.span("transfermarkt_link"):
+        if link_key not in st.session_state:
+            link_future = app_extensions.generate_transfermarkt_link_async(player_name)
+            if not link_future.done():
+                poll_transfermarkt_link(player_name, link_future)
+                return
+            st.session_state[link_key] = link_future.result()
+        render_transfermarkt_link(player_name, st.session_state[link_key])
+
+# כל אחד מהחלקים האינטראקטיביים הבאים הוא fragment: שינוי בווידג'ט שלו מריץ מחדש רק אותו,
+# בלי לחפש שוב את השחקן, לסרוק את המועדונים או לחכות לקישור לטרנספרמרקט
+@st.fragment
+def show_weighted_ysp(selected_player, ysp_gross):
+    # הזנת שווי שוק ידני (אירו במיליונים)
+    manual_market_value = app_extensions.market_value_section(selected_player)
+
+    # חישוב מדד YSP-75 משוקלל (כולל שווי שוק)
+    ysp_weighted = app_extensions.calculate_weighted_ysp(ysp_gross, manual_market_value)
+    st.metric("מדד YSP-75 (משוקלל)", round(ysp_weighted, 2))
+
+    # שמירת החיפוש עם המדד המשוקלל בלבד (פעם אחת לסשן גם כאשר הדף מורץ מחדש)
+    with perf.span("history_write"):
+        log_search(selected_player, ysp_weighted, session_id=current_session_id())
+
+@st.fragment
+def show_similar_players_fragment(index, player_id):
+    show_similar_players(index, player_id)
+
+@st.fragment
+def show_club_fit(row, clubs_df):
+    # הזנת שם קבוצה להתאמה
+    club_query = st.text_input("הקלד שם קבוצה (חלק מהשם):", key="club_input").strip().lower()
+    with perf.span("name_search"):
+        matching_clubs = load_club_index().search(club_query, limit=SEARCH_RESULT_LIMIT)
+
+    if club_query and matching_clubs:
+        selected_club = st.selectbox("בחר קבוצה מתוך התוצאות:", matching_clubs)
+        club_data = clubs_df[clubs_df["Club"] == selected_club]
+        if not club_data.empty:
+            club_row = club_data.iloc[0]
+            # חישוב מדד התאמה לקבוצה ללא שווי שוק
+            with perf.span("fit_scoring"):
+                fit_score = load_result_cache().get_or_compute(
+                    player_result_key("club_fit", row.name, selected_club),
+                    lambda: app_extensions.calculate_fit_score(player_row=row, club_row=club_row, manual_market_value=None),
+                )
+            st.metric("רמת התאמה חזויה לקבוצה", f"{fit_score}%")
+            if fit_score >= 85:
+                st.success("התאמה מצוינת – סביר שיצליח במערכת הזו.")
+            elif fit_score >= 70:
+                st.info("התאמה סבירה – עשוי להסתגל היטב.")
+            else:
+                st.warning("התאמה נמוכה – דרושה התאמה טקטית או סבלנות.")
+    elif club_query:
+        st.warning("לא נמצאו קבוצות תואמות.")
+
+SWEEP_POINTS = 60
+
+@st.fragment
+def show_market_value_sweep(player_df, clubs_df, ysp_gross, default_clubs):
+    # מה אם: המדד המשוקלל וציוני ההתאמה (דרך מקדם ה-ROI) לכל שווי שוק בטווח, בחישוב וקטורי אחד
+    st.markdown("---")
+    st.subheader("🔮 מה אם – טווח שווי שוק")
+    # השווי העתידי והמועדונים שייכים לשחקן ולכן המפתחות שלהם כוללים אותו (חיפוש שחקן אחר מתחיל מברירת המחדל שלו);
+    # טווח השווי הוא העדפת תצוגה ונשמר בין שחקנים
+    player_id = player_df.index[0]
+    low, high = st.slider("טווח שווי שוק (מיליוני אירו)", min_value=0.5, max_value=220.0, value=(5.0, 100.0), step=0.5, key="sweep_range")
+    future_value = st.number_input(
+        "שווי עתידי צפוי (מיליוני אירו)", min_value=0.0, step=1.0, format="%.1f", key=f"sweep_future_value_{player_id}",
+        help="משמש לחישוב ה-ROI בציון ההתאמה; 0 = ללא הערכה (מקדם ROI ניטרלי).",
+    )
+    clubs = st.multiselect("מועדונים להשוואה", clubs_df["Club"].tolist(), default=default_clubs, key=f"sweep_clubs_{player_id}")
+
+    market_values = np.linspace(low, high, SWEEP_POINTS)
+    selected_clubs = clubs_df[clubs_df["Club"].isin(clubs)]
+    with perf.span("fit_scoring"):
+        weighted, fits = scoring.market_value_sweep(
+            player_df, selected_clubs, ysp_gross, market_values,
+            future_value=future_value if future_value > 0 else None,
+        )
+    index = pd.Index(market_values, name="שווי שוק")
+    with perf.span("chart"):
+        st.line_chart(pd.DataFrame({"YSP-75 משוקלל": weighted}, index=index))
+        if not selected_clubs.empty:
+            st.line_chart(pd.DataFrame(fits, columns=selected_clubs["Club"].tolist(), index=index))
+
 def run_player_search():
     st.title("FstarVfootball")
 
-    df = load_data()
-    clubs_df = load_club_data()
+    with perf.span("load_data"):
+        profiles = load_player_profiles()
+        clubs_df = load_club_data()
 
     player_query = st.text_input("הקלד שם שחקן (חלק מהשם):", key="player_input").strip().lower()
-    matching_players = df[df["Player"].apply(lambda name: app_extensions.match_text(player_query, name))]
+    with perf.span("name_search"):
+        matching_players = load_player_index().search(player_query, limit=SEARCH_RESULT_LIMIT)
 
-    if player_query and not matching_players.empty:
+    if player_query and matching_players:
         if len(matching_players) == 1:
-            selected_player = matching_players["Player"].iloc[0]
+            selected_player = matching_players[0]
         else:
-            selected_player = st.selectbox("בחר שחקן מתוך תוצאות החיפוש:", matching_players["Player"].tolist())
+            selected_player = st.selectbox("בחר שחקן מתוך תוצאות החיפוש:", matching_players)
 
-        row = df[df["Player"] == selected_player].iloc[0]
+        player_id = load_player_lookup()[selected_player]
+        row = profiles.loc[player_id]
 
-        # חישוב מדד YSP-75 הגולמי (מבוסס ביצועים בלבד)
-        ysp_gross = app_extensions.calculate_ysp_score(row)
+        # מדד YSP-75 הגולמי (מבוסס ביצועים בלבד) ו-10 המועדונים המתאימים ביותר, מהמטמון המשותף אם כבר חושבו
+        with perf.span("fit_scoring"):
+            player_results = load_result_cache().get_or_compute(
+                player_result_key("player", player_id),
+                lambda: {"ysp_gross": float(row["YSP_Gross"]), "top_clubs": load_fit_index().top_clubs_for_player(player_id)},
+            )
+        ysp_gross = player_results["ysp_gross"]
         st.metric("מדד YSP-75 (גולמי)", ysp_gross)
 
         # הצגת ביצועים
         st.subheader(f"שחקן: {row['Player']}")
-        st.write(f"ליגה: {row['Comp']} | גיל: {row['Age']} | עמדה: {row['Pos']}")
+        st.write(f"ליגה: {row['Leagues']} | גיל: {row['Age']} | עמדה: {row['Pos']}")
         st.write(f"דקות: {row['Min']} | גולים: {row['Gls']} | בישולים: {row['Ast']}")
         st.write(f"דריבלים מוצלחים: {row['Succ']} | מסירות מפתח: {row['KP']}")
 
-        # הצגת קישור לטרנספרמרקט
-        link = app_extensions.generate_transfermarkt_link(selected_player)
-        if link:
-            st.markdown(f"[עמוד {selected_player} ב-Transfermarkt]({link})")
-            st.markdown("<sub>קישור דרך מנוע החיפוש DuckDuckGo עם fallback לגוגל</sub>", unsafe_allow_html=True)
-        else:
-            st.warning("לא נמצא קישור אוטומטי לעמוד הטרנספרמרקט של השחקן.")
-
-        # הזנת שווי שוק ידני (אירו במיליונים)
-        manual_market_value = app_extensions.market_value_section(selected_player)
-
-        # חישוב מדד YSP-75 משוקלל (כולל שווי שוק)
-        ysp_weighted = ysp_gross
-        if manual_market_value is not None:
-            ysp_weighted = min(
-                100,
-                ysp_gross * 0.8 +  # משקל גבוה יותר לביצועים הגולמיים
-                (manual_market_value / 220) * 20  # משקל לשווי שוק עם מקסימום של 220 מיליון אירו
-            )
-        st.metric("מדד YSP-75 (משוקלל)", round(ysp_weighted, 2))
-
-        # הזנת שם קבוצה להתאמה
-        club_query = st.text_input("הקלד שם קבוצה (חלק מהשם):", key="club_input").strip().lower()
-        matching_clubs = [c for c in clubs_df["Club"].unique() if app_extensions.match_text(club_query, c)]
-
-        if club_query and matching_clubs:
-            selected_club = st.selectbox("בחר קבוצה מתוך התוצאות:", matching_clubs)
-            club_data = clubs_df[clubs_df["Club"] == selected_club]
-            if not club_data.empty:
-                club_row = club_data.iloc[0]
-                # חישוב מדד התאמה לקבוצה ללא שווי שוק
-                fit_score = app_extensions.calculate_fit_score(player_row=row, club_row=club_row, manual_market_value=None)
-                st.metric("רמת התאמה חזויה לקבוצה", f"{fit_score}%")
-                if fit_score >= 85:
-                    st.success("התאמה מצוינת – סביר שיצליח במערכת הזו.")
-                elif fit_score >= 70:
-                    st.info("התאמה סבירה – עשוי להסתגל היטב.")
-                else:
-                    st.warning("התאמה נמוכה – דרושה התאמה טקטית או סבלנות.")
-        elif club_query:
-            st.warning("לא נמצאו קבוצות תואמות.")
+        # הצגת קישור לטרנספרמרקט - החיפוש רץ ברקע והקישור מופיע כשהוא מגיע
+        show_transfermarkt_link(row["Player"])
+
+        show_weighted_ysp(selected_player, ysp_gross)
+        show_club_fit(row, clubs_df)
 
         # הצגת 10 הקבוצות המתאימות ביותר ללא שקלול שווי שוק
         st.markdown("---")
         st.subheader("📊 10 המועדונים המתאימים ביותר לשחקן")
-        scores = []
-        for i, club_row in clubs_df.iterrows():
-            score = app_extensions.calculate_fit_score(player_row=row, club_row=club_row, manual_market_value=None)
-            scores.append((club_row["Club"], score))
-        scores.sort(key=lambda x: x[1], reverse=True)
-        top_scores = scores[:10]
-        top_df = pd.DataFrame(top_scores, columns=["Club", "Fit Score"])
-
-        st.bar_chart(top_df.set_index("Club"))
-        csv = top_df.to_csv(index=False).encode('utf-8')
+        top_df = pd.DataFrame(player_results["top_clubs"], columns=["Club", "Fit Score"])
+
+        with perf.span("chart"):
+            st.bar_chart(top_df.set_index("Club"))
+            csv = top_df.to_csv(index=False).encode('utf-8')
         st.download_button("📥 הורד את כל ההתאמות כ־CSV", data=csv, file_name=f"{selected_player}_club_fits.csv", mime='text/csv')
 
-        # שמירת החיפוש עם המדד המשוקלל בלבד
-        save_search(selected_player, ysp_weighted)
+        with perf.span("similarity"):
+            similarity_index = load_similarity_index()
+        show_similar_players_fragment(similarity_index, player_id)
+
+        show_market_value_sweep(profiles.loc[[player_id]], clubs_df, ysp_gross, top_df["Club"].head(5).tolist())
 
     else:
         if player_query:
@@ -143,7 +301,23 @@ def run_player_search():
     st.caption("הנתונים מבוססים על ניתוח אלגוריתמי לצרכים חינוכיים ואנליטיים בלבד.")
 
 # ---- תפריט ניווט ראשי ----
-if mode == "חיפוש שחקנים":
-    run_player_search()
-elif mode == "היסטוריית חיפושים":
-    show_search_history()
+# finish_run ב-finally: גם ריצה שנקטעה (חריגה, st.stop, rerun באמצע) נמדדת, ו-cProfile לא נשאר פעיל ב-thread של הסקריפט
+perf_run = perf.start_run(PAGE_KEYS[mode], profile=profile_rerun)
+try:
+    if mode == "חיפוש שחקנים":
+        run_player_search()
+    elif mode == "סקאוטינג לפי מועדון":
+        with perf.span("load_data"):
+            players_df, clubs_df = load_player_profiles(), load_club_data()
+        with perf.span("club_scouting"):
+            show_club_scouting(players_df, clubs_df)
+    elif mode == "היסטוריית חיפושים":
+        with perf.span("history_read"):
+            show_search_history()
+finally:
+    perf.finish_run(perf_run)
+
+if debug_mode:
+    perf.show_perf_panel(perf_run)
+    st.sidebar.caption("מטמון תוצאות")
+    st.sidebar.json(load_result_cache().stats())
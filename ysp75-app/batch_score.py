@@ -0,0 +1,185 @@
+import os
+import sys
+import argparse
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import data_cache
+from scoring import calculate_fit_score_matrix, calculate_weighted_ysp, top_club_fits
+from player_profiles import build_player_profiles
+from search_index import fold_text
+
+# חישוב YSP-75 והתאמות מועדונים לרשימת שחקנים שלמה, ללא streamlit (למשל בריצה לילית):
+#   python ysp75-app/batch_score.py --players-file shortlist.txt --market-values values.csv --out scores.parquet
+DATA_DIR = "ysp75-app"
+PLAYERS_CSV = os.path.join(DATA_DIR, "players_simplified_2025.csv")
+CLUBS_CSV = os.path.join(DATA_DIR, "Updated_Club_Tactical_Dataset.csv")
+DEFAULT_TOP_K = 10
+DEFAULT_CHUNK_SIZE = 2000
+OUTPUT_COLUMNS = ["Player_ID", "Player", "Display_Name", "Pos", "Age", "Leagues", "Min"]
+
+def load_players(path, season=None):
+    # הפרופילים מסכמים שורות לפי Player_ID_API, ולכן נטענת עונה אחת בלבד (ברירת מחדל: האחרונה) -
+    # אחרת כל העונות בדאטהסט היו מתחברות לשורה אחת עם דקות וסטטיסטיקות מנופחות
+    if os.path.isdir(path):
+        import ingest
+
+        if season is None:
+            df = ingest.load_latest_season(path)
+        else:
+            df = ingest.load_dataset(path, columns=ingest.APP_PLAYER_COLUMNS, seasons=[season])
+        if df is None or df.empty:
+            raise SystemExit(f"no players for season {season if season is not None else '(latest)'} in {path}")
+    elif path.endswith(".parquet"):
+        df = pd.read_parquet(path)
+    else:
+        df = data_cache.load_csv_cached(path, data_cache.PLAYER_DTYPES)
+    df.columns = df.columns.str.strip()
+    if "Season" in df.columns:
+        seasons = df["Season"].dropna().unique()
+        if season is None and len(seasons) > 1:
+            raise SystemExit(f"{path} holds seasons {sorted(seasons.tolist())}; pick one with --season")
+        if season is not None:
+            df = df[df["Season"] == season].reset_index(drop=True)
+    return df
+
+def build_lookup(profiles):
+    # שם (מנורמל), שם תצוגה או Player_ID -> Player_ID; שם תצוגה קודם לשם הגולמי
+    lookup = {}
+    for player_id, display_name in zip(profiles.index, profiles["Display_Name"]):
+        lookup[player_id] = player_id
+        lookup[fold_text(display_name)] = player_id
+    for player_id, name in zip(profiles.index, profiles["Player"]):
+        lookup.setdefault(fold_text(name), player_id)
+    return lookup
+
+def resolve_player(lookup, key):
+    key = str(key).strip()
+    return lookup.get(key, lookup.get(fold_text(key)))
+
+def read_player_list(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+def read_market_values(path, lookup):
+    # CSV עם עמודות Player (שם או Player_ID) ו-MarketValue (מיליוני אירו)
+    values = pd.read_csv(path)
+    resolved = {}
+    for key, value in zip(values["Player"], values["MarketValue"]):
+        player_id = resolve_player(lookup, key)
+        if player_id is None:
+            print(f"warning: no player matches market value row {key!r}", file=sys.stderr)
+        elif pd.notna(value):
+            resolved[player_id] = float(value)
+    return resolved
+
+_worker_clubs = None
+
+def _init_worker(clubs_df):
+    # טבלת המועדונים נשלחת פעם אחת לכל תהליך ולא עם כל מנה
+    global _worker_clubs
+    _worker_clubs = clubs_df
+
+def score_chunk(chunk, top_k=DEFAULT_TOP_K, clubs_df=None):
+    clubs_df = _worker_clubs if clubs_df is None else clubs_df
+    gross = chunk["YSP_Gross"].to_numpy(dtype=np.float64)
+    manual = chunk["MarketValue_Manual"].to_numpy(dtype=np.float64)
+    weighted = np.where(np.isnan(manual), gross, calculate_weighted_ysp(gross, np.nan_to_num(manual)))
+
+    out = chunk[OUTPUT_COLUMNS].reset_index(drop=True)
+    out["YSP_Gross"] = gross
+    out["MarketValue_Manual"] = manual
+    out["YSP_Weighted"] = np.round(weighted, 2)
+    # כמו באפליקציה: מועדוני ה-top-K מחושבים ללא שקלול שווי השוק הידני
+    fits = top_club_fits(calculate_fit_score_matrix(chunk, clubs_df), clubs_df["Club"], k=top_k)
+    for rank in range(top_k):
+        out[f"Club_{rank + 1}"] = [row[rank][0] if rank < len(row) else None for row in fits]
+        out[f"Fit_{rank + 1}"] = [row[rank][1] if rank < len(row) else np.nan for row in fits]
+    return out
+
+class ResultWriter:
+    # כתיבה מדורגת של המנות לקובץ אחד, כך שהזיכרון לא תלוי בגודל הרשימה
+    def __init__(self, path):
+        self.path = path
+        self.parquet = path.endswith(".parquet")
+        self._writer = None
+        self._wrote_header = False
+        self.rows = 0
+
+    def write(self, df):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table.cast(self._writer.schema))
+        else:
+            df.to_csv(self.path, mode="a" if self._wrote_header else "w", header=not self._wrote_header, index=False)
+            self._wrote_header = True
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+def iter_chunks(df, chunk_size):
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size]
+
+def run_batch(profiles, clubs_df, out_path, top_k=DEFAULT_TOP_K, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    writer = ResultWriter(out_path)
+    try:
+        if workers == 1:
+            for chunk in iter_chunks(profiles, chunk_size):
+                writer.write(score_chunk(chunk, top_k, clubs_df))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(clubs_df,)) as executor:
+                # map שומר על סדר המנות; כל מנה נכתבת ברגע שהיא ומה שלפניה הסתיימו
+                for result in executor.map(partial(score_chunk, top_k=top_k), iter_chunks(profiles, chunk_size)):
+                    writer.write(result)
+    finally:
+        writer.close()
+    return writer.rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score players (YSP-75 gross/weighted and top club fits) without the Streamlit app.")
+    parser.add_argument("--players-csv", default=PLAYERS_CSV, help="players CSV, Parquet file or dataset directory")
+    parser.add_argument("--season", type=int, help="season to score from a multi-season dataset (default: the latest)")
+    parser.add_argument("--clubs-csv", default=CLUBS_CSV)
+    parser.add_argument("--players", nargs="+", help="player names or Player_IDs (default: everyone)")
+    parser.add_argument("--players-file", help="text file with one player name or Player_ID per line")
+    parser.add_argument("--market-values", help="CSV with Player and MarketValue (million EUR) columns")
+    parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--out", required=True, help="output .csv or .parquet")
+    args = parser.parse_args(argv)
+
+    profiles = build_player_profiles(load_players(args.players_csv, args.season))
+    clubs_df = data_cache.load_csv_cached(args.clubs_csv, data_cache.CLUB_DTYPES)
+    lookup = build_lookup(profiles)
+
+    requested = (args.players or []) + (read_player_list(args.players_file) if args.players_file else [])
+    if requested:
+        ids = []
+        for key in requested:
+            player_id = resolve_player(lookup, key)
+            if player_id is None:
+                print(f"warning: player {key!r} not found", file=sys.stderr)
+            else:
+                ids.append(player_id)
+        profiles = profiles.loc[list(dict.fromkeys(ids))]
+
+    market_values = read_market_values(args.market_values, lookup) if args.market_values else {}
+    profiles = profiles.reset_index()
+    profiles["MarketValue_Manual"] = profiles["Player_ID"].map(market_values).astype(np.float64)
+
+    rows = run_batch(profiles, clubs_df, args.out, top_k=args.top_k, workers=args.workers, chunk_size=args.chunk_size)
+    print(f"wrote {rows} players to {args.out}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,353 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import tempfile
+import numpy as np
+import pandas as pd
+import scoring
+import search_history
+from search_index import NameIndex
+from player_profiles import build_player_profiles
+from fit_index import FitIndex
+from similarity import SimilarityIndex
+
+DATA_DIR = "ysp75-app"
+PLAYERS_CSV = os.path.join(DATA_DIR, "players_simplified_2025.csv")
+CLUBS_CSV = os.path.join(DATA_DIR, "Updated_Club_Tactical_Dataset.csv")
+BASELINE_PATH = os.path.join(DATA_DIR, "benchmarks_baseline.json")
+
+SEARCH_QUERIES = ["a", "ma", "son", "kane", "lopez", "mbapp", "de bru", "zzzz"]
+SEARCH_LIMIT = 100
+SCALAR_SAMPLE = 2000
+# מודולים שזמן הייבוא והזיכרון שלהם נמדדים בתהליך נקי; streamlit ו-transfermarkt כנקודת השוואה
+STARTUP_MODULES = ["scoring", "app_extensions", "batch_score", "transfermarkt", "streamlit"]
+STARTUP_SCRIPT = """
+import sys, json, time, resource, importlib
+
+def peak_rss_kb():
+    # VmHWM מתאפס ב-exec; ru_maxrss בלינוקס יורש את שיא הזיכרון של תהליך האב
+    try:
+        with open("/proc/self/status") as f:
+            return next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+    except (OSError, StopIteration):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+base_rss = peak_rss_kb()
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "rss_kb": peak_rss_kb(), "base_rss_kb": base_rss,
+                  "streamlit": "streamlit" in sys.modules, "modules": len(sys.modules)}))
+"""
+# זיכרון אינדקס השמות בתהליך נקי: תוספת ה-RSS מבניית האינדקס (רשימת השמות נקראת מקובץ לפני המדידה)
+SEARCH_INDEX_RSS_SCRIPT = """
+import sys, json
+from search_index import NameIndex
+
+def rss_kb():
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+
+with open(sys.argv[1], encoding="utf-8") as f:
+    names = f.read().split("\\n")
+before = rss_kb()
+index = NameIndex(names)
+print(json.dumps({"rss_kb": rss_kb() - before, "names": len(index)}))
+"""
+STAT_COLUMNS = ["Min", "Gls", "Ast", "Tkl", "Int", "Clr", "Blocks", "Succ", "Carries", "KP"]
+
+def load_base_frames():
+    players = pd.read_csv(PLAYERS_CSV)
+    players.columns = players.columns.str.strip()
+    clubs = pd.read_csv(CLUBS_CSV)
+    clubs.columns = clubs.columns.str.strip()
+    return players, clubs
+
+def synthetic_players(players, scale, seed=0):
+    # נתונים סינתטיים בגודל scale x המאגר: שורות מהמאגר עם רעש בסטטיסטיקות ושמות ייחודיים
+    if scale == 1:
+        return players.copy()
+    rng = np.random.default_rng(seed)
+    rows = players.sample(n=len(players) * scale, replace=True, random_state=seed).reset_index(drop=True)
+    for col in STAT_COLUMNS:
+        noise = rng.normal(1.0, 0.15, len(rows))
+        rows[col] = np.maximum(0, np.round(rows[col] * noise)).astype("int64")
+    for col in ["xG", "xAG"]:
+        rows[col] = np.maximum(0, np.round(rows[col] * rng.normal(1.0, 0.15, len(rows)), 1))
+    rows["Player"] = rows["Player"] + " " + pd.Series(np.arange(len(rows)) // len(players), dtype=str)
+    return rows
+
+def measure(fn, repeat, items=1):
+    # מריץ fn כמה פעמים ומחזיר אחוזוני זמן (מילישניות) ותפוקה (פריטים לשנייה)
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    latencies = np.array(latencies) * 1000
+    return {
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "throughput_per_s": float(items / (np.median(latencies) / 1000)) if np.median(latencies) > 0 else float("inf"),
+        "repeat": repeat,
+        "items": items,
+    }
+
+def measure_each(fn, args_list):
+    # זמן לכל קריאה בנפרד - לפונקציות סקלריות ולכתיבות היסטוריה
+    latencies = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        latencies.append(time.perf_counter() - start)
+    latencies = np.array(latencies) * 1000
+    return {
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "throughput_per_s": float(len(latencies) / (latencies.sum() / 1000)),
+        "repeat": 1,
+        "items": len(latencies),
+    }
+
+def scalar_pairs(players, clubs, count, seed=0):
+    rng = np.random.default_rng(seed)
+    # שורות דרך iloc - כמו באפליקציה (סקלרים של NumPy ולא של פייתון)
+    player_rows = [players.iloc[i] for i in rng.integers(0, len(players), count)]
+    club_rows = [clubs.iloc[i] for i in rng.integers(0, len(clubs), count)]
+    return list(zip(player_rows, club_rows))
+
+def check_equivalence(players, clubs, sample=SCALAR_SAMPLE, seed=0):
+    # בדיקה שהמסלולים המהירים מחזירים בדיוק את מה שמחזירות הפונקציות הסקלריות
+    failures = []
+    rng = np.random.default_rng(seed)
+    player_positions = rng.integers(0, len(players), sample)
+    club_positions = rng.integers(0, len(clubs), sample)
+
+    matrix = scoring.calculate_fit_score_matrix(players, clubs)
+    for p, c in zip(player_positions, club_positions):
+        expected = scoring.calculate_fit_score(players.iloc[p], clubs.iloc[c])
+        if matrix[p, c] != expected:
+            failures.append(f"fit_score[{p},{c}]: matrix={matrix[p, c]} scalar={expected}")
+
+    ysp = scoring.calculate_ysp_scores(players)
+    for p in np.unique(player_positions):
+        expected = scoring.calculate_ysp_score(players.iloc[p])
+        if ysp[p] != expected:
+            failures.append(f"ysp_score[{p}]: vectorized={ysp[p]} scalar={expected}")
+
+    profiles = build_player_profiles(players)
+    for p in rng.integers(0, len(profiles), min(sample, len(profiles))):
+        expected = scoring.calculate_ysp_score(profiles.iloc[p])
+        if profiles["YSP_Gross"].iloc[p] != expected:
+            failures.append(f"profile ysp[{profiles.index[p]}]: column={profiles['YSP_Gross'].iloc[p]} scalar={expected}")
+
+    index = FitIndex.build(players, clubs, k=10)
+    for p in np.unique(player_positions)[:200]:
+        row = players.iloc[p]
+        scores = [(club_row["Club"], scoring.calculate_fit_score(row, club_row)) for _, club_row in clubs.iterrows()]
+        scores.sort(key=lambda x: x[1], reverse=True)
+        top = list(zip(index.club_names[index.player_top[p]].tolist(), index.scores[p, index.player_top[p]].tolist()))
+        if top != scores[:10]:
+            failures.append(f"fit_index top-10 for row {p} differs from sorted scalar scores")
+
+    name_index = NameIndex(players["Player"])
+    unique_names = list(dict.fromkeys(players["Player"].astype(str)))
+    for query in SEARCH_QUERIES:
+        expected = {name for name in unique_names if scoring.match_text(query, name)}
+        full = name_index.search(query)
+        missing = expected - set(full)
+        if missing:
+            failures.append(f"search '{query}': index misses {sorted(missing)[:5]}")
+        if name_index.search(query, limit=SEARCH_LIMIT) != full[:SEARCH_LIMIT]:
+            failures.append(f"search '{query}': limited results differ from the full ranking")
+    return failures
+
+def run_scoring_benchmarks(players, clubs, repeat):
+    results = {}
+    pairs = scalar_pairs(players, clubs, min(SCALAR_SAMPLE, len(players) * len(clubs)))
+    results["fit_score_scalar"] = measure_each(lambda p, c: scoring.calculate_fit_score(p, c), pairs)
+    results["fit_score_matrix"] = measure(
+        lambda: scoring.calculate_fit_score_matrix(players, clubs), repeat, items=len(players) * len(clubs)
+    )
+    results["ysp_score_scalar"] = measure_each(scoring.calculate_ysp_score, [(p,) for p, _ in pairs])
+    results["ysp_score_vectorized"] = measure(lambda: scoring.calculate_ysp_scores(players), repeat, items=len(players))
+    results["player_profiles_build"] = measure(lambda: build_player_profiles(players), repeat, items=len(players))
+    results["fit_index_build"] = measure(lambda: FitIndex.build(players, clubs), repeat, items=len(players) * len(clubs))
+    profiles = build_player_profiles(players)
+    results["similarity_index_build"] = measure(lambda: SimilarityIndex(profiles), repeat, items=len(profiles))
+    similarity_index = SimilarityIndex(profiles)
+    query_keys = profiles.index[:: max(1, len(profiles) // 20)][:20]
+    results["similarity_query"] = measure(
+        lambda: [similarity_index.similar_to(key, k=10, min_minutes=450) for key in query_keys], repeat, items=len(query_keys)
+    )
+    return results
+
+def search_index_rss_kb(names):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "names.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(map(str, names)))
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.path.dirname(os.path.abspath(__file__)), os.environ.get("PYTHONPATH")])))
+        output = subprocess.run([sys.executable, "-c", SEARCH_INDEX_RSS_SCRIPT, path], env=env, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout)["rss_kb"]
+
+def run_search_benchmarks(players, repeat):
+    results = {}
+    names = players["Player"]
+    results["search_match_text_scan"] = measure(
+        lambda: [names[names.apply(lambda name: scoring.match_text(q, name))] for q in SEARCH_QUERIES],
+        repeat,
+        items=len(SEARCH_QUERIES),
+    )
+    results["search_index_build"] = measure(lambda: NameIndex(names), max(1, repeat // 2), items=len(names))
+    if sys.platform.startswith("linux"):
+        results["search_index_build"]["rss_mb"] = search_index_rss_kb(names) / 1024
+    index = NameIndex(names)
+    results["search_index_query"] = measure(
+        lambda: [index.search(q, limit=SEARCH_LIMIT) for q in SEARCH_QUERIES], repeat, items=len(SEARCH_QUERIES)
+    )
+    return results
+
+def run_history_benchmarks(writes, repeat):
+    # ההיסטוריה נכתבת למסד זמני כדי לא לגעת בנתונים האמיתיים
+    results = {}
+    original_db, original_csv = search_history.SEARCH_HISTORY_DB, search_history.SEARCH_HISTORY_FILE
+    original_flush_seconds = search_history.SEARCH_LOG_FLUSH_SECONDS
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        search_history.SEARCH_HISTORY_DB = os.path.join(tmp_dir, "search_history.db")
+        search_history.SEARCH_HISTORY_FILE = os.path.join(tmp_dir, "search_history.csv")
+        search_history._store_ready = False
+        # בלי חלון האיסוף של ה-writer: ה-flush בסוף לא ימתין SEARCH_LOG_FLUSH_SECONDS
+        search_history.SEARCH_LOG_FLUSH_SECONDS = 0
+        try:
+            entries = [(f"Player {i % 500}", float(i % 100)) for i in range(writes)]
+            results["history_save_search"] = measure_each(search_history.save_search, entries)
+            results["history_player_summary"] = measure(search_history.load_player_summary, repeat)
+            results["history_page"] = measure(lambda: search_history.load_search_history_page(0, 100), repeat)
+            results["history_log_search_enqueue"] = measure_each(
+                search_history.log_search, [(name, score, "bench-session") for name, score in entries]
+            )
+            search_history.flush_search_log()
+            # עלות הכתיבה של ה-writer עצמה: מנה אחת של כל החיפושים בטרנזקציה אחת
+            now = time.strftime("%Y-%m-%d %H:%M:%S")
+            batch = [(name, score, now) for name, score in entries]
+            results["history_write_batch"] = measure(lambda: search_history._write_searches(batch), repeat, items=len(batch))
+        finally:
+            search_history.SEARCH_HISTORY_DB, search_history.SEARCH_HISTORY_FILE = original_db, original_csv
+            search_history.SEARCH_LOG_FLUSH_SECONDS = original_flush_seconds
+            search_history._store_ready = False
+    return results
+
+def run_startup_benchmarks(repeat):
+    # כל מדידה בתהליך פייתון חדש - אחרת הייבוא כבר נמצא ב-sys.modules
+    results = {}
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.path.dirname(os.path.abspath(__file__)), os.environ.get("PYTHONPATH")])))
+    for module in STARTUP_MODULES:
+        runs = []
+        for _ in range(repeat):
+            output = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT, module], env=env, capture_output=True, text=True, check=True)
+            runs.append(json.loads(output.stdout))
+        latencies = np.array([run["seconds"] for run in runs]) * 1000
+        results[f"import_{module}"] = {
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+            "p99_ms": float(np.percentile(latencies, 99)),
+            "throughput_per_s": None,
+            "repeat": repeat,
+            "items": 1,
+            "rss_mb": float(np.median([run["rss_kb"] for run in runs]) / 1024),
+            "imports_streamlit": runs[0]["streamlit"],
+        }
+    return results
+
+def compare_to_baseline(results, baseline, tolerance):
+    # רגרסיה = p50 שעלה מעבר לפקטור tolerance ביחס לבסיס השמור
+    regressions = []
+    for scale, benches in results.items():
+        for name, stats in benches.items():
+            base = baseline.get("results", {}).get(scale, {}).get(name)
+            if base and base["p50_ms"] > 0 and stats["p50_ms"] > base["p50_ms"] * tolerance:
+                regressions.append(f"{name} @ {scale}: p50 {stats['p50_ms']:.2f} ms vs baseline {base['p50_ms']:.2f} ms")
+    return regressions
+
+def print_report(results):
+    print(f"{'benchmark':<30} {'scale':>6} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'items/s':>14}")
+    for scale, benches in results.items():
+        for name, stats in benches.items():
+            throughput = stats["throughput_per_s"]
+            throughput = f"{throughput:14.0f}" if throughput is not None else f"{'-':>14}"
+            memory = f"  rss {stats['rss_mb']:.1f} MB" if "rss_mb" in stats else ""
+            print(f"{name:<30} {scale:>6} {stats['p50_ms']:10.3f} {stats['p95_ms']:10.3f} {stats['p99_ms']:10.3f} {throughput}{memory}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks for scoring, search and search-history hot paths.")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100], help="synthetic data size as a multiple of the bundled CSVs")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--history-writes", type=int, default=500)
+    parser.add_argument("--skip-equivalence", action="store_true")
+    parser.add_argument("--skip-startup", action="store_true", help="skip the per-module import time / memory measurements")
+    parser.add_argument("--save-baseline", action="store_true", help=f"store the results in {BASELINE_PATH}")
+    parser.add_argument("--compare", action="store_true", help="fail if p50 regressed against the stored baseline")
+    parser.add_argument("--tolerance", type=float, default=1.25)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    args = parser.parse_args(argv)
+
+    base_players, base_clubs = load_base_frames()
+
+    if not args.skip_equivalence:
+        failures = check_equivalence(base_players, base_clubs)
+        failures += check_equivalence(synthetic_players(base_players, 10, seed=1), base_clubs, sample=500, seed=1)
+        if failures:
+            print("equivalence check FAILED:")
+            for failure in failures[:20]:
+                print("  " + failure)
+            return 2
+        print("equivalence checks passed")
+
+    results = {}
+    for scale in args.scales:
+        # רק טבלת השחקנים גדלה; טבלת המועדונים נשארת בגודלה האמיתי (מטריצת x100 היא כבר ~27 מיליון תאים)
+        players = synthetic_players(base_players, scale)
+        results[f"x{scale}"] = {
+            **run_scoring_benchmarks(players, base_clubs, args.repeat),
+            **run_search_benchmarks(players, args.repeat),
+        }
+    results["history"] = run_history_benchmarks(args.history_writes, args.repeat)
+    if not args.skip_startup:
+        results["startup"] = run_startup_benchmarks(args.repeat)
+    print_report(results)
+
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"no baseline at {args.baseline}; run with --save-baseline first")
+            return 1
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare_to_baseline(results, json.load(f), args.tolerance)
+        if regressions:
+            print("performance regressions:")
+            for regression in regressions:
+                print("  " + regression)
+            return 1
+        print("no regressions against baseline")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "numpy": np.__version__,
+                "pandas": pd.__version__,
+                "results": results,
+            }, f, indent=2)
+        print(f"baseline saved to {args.baseline}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+import os
+import json
+import hashlib
+import pandas as pd
+import pyarrow.feather as feather
+
+DATA_DIR = "ysp75-app"
+CACHE_DIR = os.path.join(DATA_DIR, ".cache")
+# להעלות כשמשתנים הטיפוסים או פורמט הקובץ, כדי שמטמונים ישנים ייבנו מחדש
+CACHE_FORMAT_VERSION = 1
+
+# עמודות ספירה ב-int32 וטקסט חוזר כ-category. xG/xAG נשארים float64 כדי שהציונים יהיו זהים לאלה שמחושבים מה-CSV
+PLAYER_DTYPES = {
+    "Player": "string",
+    "Comp": "category",
+    "Pos": "category",
+    "Age": "float32",
+    "Min": "int32",
+    "Gls": "int32",
+    "Ast": "int32",
+    "Tkl": "int32",
+    "Int": "int32",
+    "Clr": "int32",
+    "Blocks": "int32",
+    "Succ": "int32",
+    "Carries": "int32",
+    "KP": "int32",
+    "xG": "float64",
+    "xAG": "float64",
+}
+
+# ערכי המועדונים מושווים לספים כמו 1.8 ו-87, לכן העמודות המספריות נשארות float64
+CLUB_DTYPES = {
+    "Club": "string",
+    "League": "category",
+    "Common Formation": "category",
+    "Playing Style": "category",
+    "Pressing Style": "category",
+    "Defensive Line Depth": "category",
+    "Pressing Line Height": "category",
+}
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _cache_paths(csv_path, cache_dir):
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(cache_dir, name + ".feather"), os.path.join(cache_dir, name + ".meta.json")
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_json(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+def _cache_is_fresh(csv_path, cache_path, meta_path, dtypes):
+    # בדיקה זולה לפי mtime+גודל; רק אם הם השתנו מחשבים hash (למשל אחרי git checkout שלא שינה תוכן)
+    meta = _read_meta(meta_path)
+    if meta is None or not os.path.exists(cache_path):
+        return False
+    if meta.get("version") != CACHE_FORMAT_VERSION or meta.get("dtypes") != dtypes:
+        return False
+    stat = os.stat(csv_path)
+    if meta.get("mtime_ns") == stat.st_mtime_ns and meta.get("size") == stat.st_size:
+        return True
+    if meta.get("sha256") != file_sha256(csv_path):
+        return False
+    meta.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+    _write_json(meta_path, meta)
+    return True
+
+def build_cache(csv_path, dtypes, cache_dir=CACHE_DIR):
+    cache_path, meta_path = _cache_paths(csv_path, cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    stat = os.stat(csv_path)
+    df = pd.read_csv(csv_path)
+    df.columns = df.columns.str.strip()
+    df = df.astype({col: dtype for col, dtype in dtypes.items() if col in df.columns})
+    # Feather ללא דחיסה ניתן למיפוי זיכרון, כך שכמה workers חולקים את אותם עמודים מה-page cache
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    feather.write_feather(df, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, cache_path)
+    _write_json(meta_path, {
+        "version": CACHE_FORMAT_VERSION,
+        "dtypes": dtypes,
+        "sha256": file_sha256(csv_path),
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+    })
+    return cache_path
+
+def load_csv_cached(csv_path, dtypes, cache_dir=CACHE_DIR):
+    # טוען CSV דרך מטמון Feather ממופה-זיכרון עם טיפוסים מוצהרים; המטמון נבנה מחדש רק כשה-CSV משתנה
+    cache_path, meta_path = _cache_paths(csv_path, cache_dir)
+    if not _cache_is_fresh(csv_path, cache_path, meta_path, dtypes):
+        build_cache(csv_path, dtypes, cache_dir)
+    table = feather.read_table(cache_path, memory_map=True)
+    # split_blocks מונע איחוד עמודות לבלוק אחד, כך שעמודות מספריות ללא NaN נשארות תצוגה על הקובץ הממופה
+    return table.to_pandas(split_blocks=True)
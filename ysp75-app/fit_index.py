@@ -0,0 +1,175 @@
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from scoring import FIT_WEIGHTS, calculate_fit_score_matrix
+
+DATA_DIR = "ysp75-app"
+FIT_INDEX_PATH = os.path.join(DATA_DIR, ".cache", "fit_index.npz")
+DEFAULT_TOP_K = 10
+
+def frame_signature(*frames):
+    # חתימת תוכן של הטבלאות ומשקלי ההתאמה - אינדקס שנשמר עם חתימה אחרת אינו תקף
+    digest = hashlib.sha256(json.dumps(FIT_WEIGHTS, sort_keys=True).encode())
+    for frame in frames:
+        digest.update(",".join(map(str, frame.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def _top_k(values, k):
+    # k הגבוהים בסדר יורד; בשוויון - לפי המיקום המקורי (כמו sort יציב של פייתון)
+    if len(values) > k:
+        candidates = np.argpartition(-values, k - 1)[:k]
+        # argpartition לא מבטיח אילו שווים לציון ה-k נבחרו, לכן לוקחים את כל השווים לו וממיינים
+        candidates = np.flatnonzero(values >= values[candidates].min())
+    else:
+        candidates = np.arange(len(values))
+    order = np.lexsort((candidates, -values[candidates]))
+    return candidates[order][:k]
+
+class FitIndex:
+    # מטריצת ההתאמה המלאה (שחקן x מועדון) ולצדה k המועדונים המובילים לכל שחקן ו-k השחקנים המובילים לכל מועדון
+    def __init__(self, player_keys, club_names, scores, k=DEFAULT_TOP_K, signature=None, key_column="Player", club_signature=None):
+        self.player_keys = np.asarray(player_keys, dtype=object)
+        self.club_names = np.asarray(club_names, dtype=object)
+        self.scores = np.asarray(scores, dtype=np.float64)
+        self.k = k
+        self.signature = signature
+        self.key_column = key_column
+        # חתימת המועדונים והמשקלים בלבד: כל עוד היא זהה, אפשר לעדכן שורות של שחקנים בודדים במקום לבנות מחדש
+        self.club_signature = club_signature
+        self._player_positions = {}
+        for position, key in enumerate(self.player_keys.tolist()):
+            self._player_positions.setdefault(key, position)
+        self._club_positions = {}
+        for position, club in enumerate(self.club_names.tolist()):
+            self._club_positions.setdefault(club, position)
+        # מיון יציב לכל השורות/עמודות בבת אחת; עדכונים בודדים משתמשים ב-_top_k
+        self.player_top = np.argsort(-self.scores, axis=1, kind="stable")[:, :k].astype(np.int64)
+        self.club_top = np.argsort(-self.scores.T, axis=1, kind="stable")[:, :k].astype(np.int64)
+
+    @classmethod
+    def build(cls, players_df, clubs_df, k=DEFAULT_TOP_K, key_column="Player"):
+        scores = calculate_fit_score_matrix(players_df, clubs_df)
+        return cls(players_df[key_column], clubs_df["Club"], scores, k=k,
+                   signature=frame_signature(players_df, clubs_df), key_column=key_column,
+                   club_signature=frame_signature(clubs_df))
+
+    def top_clubs_for_player(self, player_key):
+        position = self._player_positions.get(player_key)
+        if position is None:
+            return []
+        top = self.player_top[position]
+        return list(zip(self.club_names[top].tolist(), self.scores[position, top].tolist()))
+
+    def top_players_for_club(self, club_name):
+        position = self._club_positions.get(club_name)
+        if position is None:
+            return []
+        top = self.club_top[position]
+        return list(zip(self.player_keys[top].tolist(), self.scores[top, position].tolist()))
+
+    def update_player(self, position, players_df, clubs_df):
+        self.update_players([position], players_df, clubs_df)
+
+    def update_players(self, positions, players_df, clubs_df):
+        # חישוב מחדש של שורות השחקנים שהשתנו בלבד (מטריצה אחת לכולם), וחתימה אחת בסוף
+        positions = list(positions)
+        rows = calculate_fit_score_matrix(players_df.iloc[positions], clubs_df)
+        for position, row in zip(positions, rows):
+            self._set_player_row(position, row, players_df.iloc[position][self.key_column])
+        self.signature = frame_signature(players_df, clubs_df)
+
+    def _set_player_row(self, position, row, key):
+        # רשימות המועדונים מתעדכנות רק איפה שהשחקן נכנס או יצא מה-top-K
+        old_row = self.scores[position].copy()
+        self.scores[position] = row
+        self.player_top[position] = _top_k(row, self.k)
+        short_lists = self.club_top.shape[1] < self.k
+        for club in range(len(self.club_names)):
+            top = self.club_top[club]
+            was_in_top = position in top
+            enters_top = row[club] >= self.scores[top[-1], club]
+            if short_lists or (was_in_top and row[club] != old_row[club]) or (not was_in_top and enters_top):
+                self.club_top[club] = _top_k(self.scores[:, club], self.k)
+        self.player_keys[position] = key
+        self._player_positions.setdefault(key, position)
+
+    def update_club(self, position, players_df, clubs_df):
+        column = calculate_fit_score_matrix(players_df, clubs_df.iloc[[position]])[:, 0]
+        old_column = self.scores[:, position].copy()
+        self.scores[:, position] = column
+        self.club_top[position] = _top_k(column, self.k)
+        kth_scores = self.scores[np.arange(len(self.player_keys)), self.player_top[:, -1]]
+        was_in_top = (self.player_top == position).any(axis=1)
+        affected = (was_in_top & (column != old_column)) | (~was_in_top & (column >= kth_scores))
+        if self.player_top.shape[1] < self.k:
+            affected[:] = True
+        for player in np.flatnonzero(affected):
+            self.player_top[player] = _top_k(self.scores[player], self.k)
+        self.club_names[position] = clubs_df.iloc[position]["Club"]
+        self._club_positions.setdefault(self.club_names[position], position)
+        self.signature = frame_signature(players_df, clubs_df)
+        self.club_signature = frame_signature(clubs_df)
+
+    def save(self, path=FIT_INDEX_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(
+            tmp_path,
+            player_keys=self.player_keys.astype(str),
+            club_names=self.club_names.astype(str),
+            scores=self.scores,
+            k=np.int64(self.k),
+            signature=np.str_(self.signature or ""),
+            key_column=np.str_(self.key_column),
+            club_signature=np.str_(self.club_signature or ""),
+        )
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path=FIT_INDEX_PATH, signature=None):
+        # מחזיר None אם אין קובץ או שהחתימה לא תואמת את הנתונים הנוכחיים
+        if not os.path.exists(path):
+            return None
+        with np.load(path, allow_pickle=False) as data:
+            saved_signature = str(data["signature"])
+            if signature is not None and saved_signature != signature:
+                return None
+            club_signature = str(data["club_signature"]) if "club_signature" in data.files else None
+            return cls(data["player_keys"], data["club_names"], data["scores"], k=int(data["k"]),
+                       signature=saved_signature, key_column=str(data["key_column"]), club_signature=club_signature or None)
+
+def load_or_build_fit_index(players_df, clubs_df, k=DEFAULT_TOP_K, path=FIT_INDEX_PATH, key_column="Player"):
+    signature = frame_signature(players_df, clubs_df)
+    index = FitIndex.load(path, signature=signature)
+    if index is None or index.k != k or index.key_column != key_column:
+        index = FitIndex.build(players_df, clubs_df, k=k, key_column=key_column)
+        index.save(path)
+    return index
+
+def refresh_fit_index(players_df, clubs_df, changed_keys, k=DEFAULT_TOP_K, path=FIT_INDEX_PATH, key_column="Player"):
+    # אחרי סנכרון מצטבר: אם המועדונים, המשקלים וסדר השחקנים לא השתנו - מחשבים מחדש רק את שורות השחקנים שהשתנו.
+    # אחרת (שחקנים חדשים/שנמחקו, מועדונים או משקלים אחרים) בונים את האינדקס מחדש. מחזיר (אינדקס, האם נבנה מחדש)
+    index = FitIndex.load(path)
+    keys = players_df[key_column].astype(str).to_numpy(dtype=object)
+    reusable = (
+        index is not None
+        and index.k == k
+        and index.key_column == key_column
+        and index.club_signature == frame_signature(clubs_df)
+        and np.array_equal(index.player_keys.astype(str), keys)
+    )
+    if not reusable:
+        index = FitIndex.build(players_df, clubs_df, k=k, key_column=key_column)
+        index.save(path)
+        return index, True
+    positions = [index._player_positions[key] for key in dict.fromkeys(map(str, changed_keys)) if key in index._player_positions]
+    if positions:
+        index.update_players(positions, players_df, clubs_df)
+    else:
+        index.signature = frame_signature(players_df, clubs_df)
+    index.save(path)
+    return index, False
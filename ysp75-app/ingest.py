@@ -0,0 +1,247 @@
+import os
+import json
+import argparse
+import pandas as pd
+import data_cache
+from players_data import ApiFootballClient, fetch_changed_pages, fetch_players_from_api, simplify_players
+from player_profiles import build_player_profiles
+from fit_index import FIT_INDEX_PATH, refresh_fit_index
+from result_cache import RESULT_CACHE_DB, ResultCache, scoring_signature
+
+DATA_DIR = "ysp75-app"
+PLAYERS_DATASET_DIR = os.path.join(DATA_DIR, "players_dataset")
+# מצב הסנכרון המצטבר (ETag, חתימת תוכן ומזהי השחקנים לכל עמוד) לכל ליגה+עונה
+SYNC_STATE_DIR = os.path.join(DATA_DIR, "api_sync")
+CLUBS_CSV = os.path.join(DATA_DIR, "Updated_Club_Tactical_Dataset.csv")
+
+# העמודות שהאפליקציה צריכה מהדאטהסט המחולק (נקרא רק מה שנדרש)
+APP_PLAYER_COLUMNS = ["Player", "Comp", "Age", "Min", "Gls", "Ast", "Pos", "Tkl", "Int", "Clr", "Blocks", "Succ", "KP", "Player_ID_API"]
+
+# מזהי הליגות ב-API-Football ושמן בפורמט של players_simplified_2025.csv (משמש לשקלול הליגות)
+LEAGUE_NAMES = {
+    39: "eng Premier League",
+    140: "es La Liga",
+    78: "de Bundesliga",
+    135: "it Serie A",
+    61: "fr Ligue 1",
+}
+
+POSITION_CODES = {
+    "Goalkeeper": "GK",
+    "Defender": "DF",
+    "Midfielder": "MF",
+    "Attacker": "FW",
+}
+
+STAT_COLUMNS = ["Min", "Gls", "Ast", "Tkl", "Int", "Clr", "Blocks", "Succ", "KP"]
+
+def to_app_schema(df, league_id, season):
+    # התאמת פלט ה-API לעמודות ולערכים שפונקציות הציון מצפות להם (DF/MF/FW, "eng Premier League")
+    df = df.copy()
+    df["Pos"] = df["Pos"].map(POSITION_CODES).fillna(df["Pos"])
+    df["Comp"] = LEAGUE_NAMES.get(league_id, None) or df["Comp"]
+    for col in STAT_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype("int64")
+    # תמיד float64: גיל חסר לשחקן אחד לא ישנה את סוג העמודה (ואת החתימות) של כל המחיצה
+    df["Age"] = pd.to_numeric(df["Age"], errors="coerce").astype("float64")
+    df["Season"] = season
+    df["LeagueID"] = league_id
+    return df
+
+def dedupe_players(df):
+    # שחקן יכול להופיע בכמה עמודים של אותה ליגה; נשמרת הרשומה האחרונה לכל Player_ID_API
+    df = df.dropna(subset=["Player_ID_API"]).drop_duplicates(subset=["Player_ID_API"], keep="last")
+    df["Player_ID_API"] = df["Player_ID_API"].astype("int64")
+    return df
+
+def write_partition(df, dataset_dir, season, league_id):
+    # מחיצה אחת לכל עונה+ליגה (Season=2023/LeagueID=39); החלפה אטומית של הקובץ כך שהרצה חוזרת לא משכפלת שורות
+    partition_dir = os.path.join(dataset_dir, f"Season={season}", f"LeagueID={league_id}")
+    os.makedirs(partition_dir, exist_ok=True)
+    path = os.path.join(partition_dir, "part-0.parquet")
+    tmp_path = path + ".tmp"
+    df.drop(columns=["Season", "LeagueID"]).to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+def ingest_players(league_ids, seasons, dataset_dir=PLAYERS_DATASET_DIR, client=None, workers=4):
+    client = client or ApiFootballClient()
+    written = []
+    for season in seasons:
+        for league_id in league_ids:
+            df = fetch_players_from_api(league_id, season, client=client, workers=workers)
+            if df.empty:
+                continue
+            df = dedupe_players(to_app_schema(df, league_id, season))
+            written.append(write_partition(df, dataset_dir, season, league_id))
+            print(f"season {season} league {league_id}: {len(df)} players")
+    return written
+
+def available_partitions(dataset_dir=PLAYERS_DATASET_DIR):
+    partitions = []
+    if not os.path.isdir(dataset_dir):
+        return partitions
+    for season_dir in sorted(os.listdir(dataset_dir)):
+        if not season_dir.startswith("Season="):
+            continue
+        for league_dir in sorted(os.listdir(os.path.join(dataset_dir, season_dir))):
+            if league_dir.startswith("LeagueID="):
+                partitions.append((int(season_dir.split("=", 1)[1]), int(league_dir.split("=", 1)[1])))
+    return partitions
+
+def load_dataset(dataset_dir=PLAYERS_DATASET_DIR, columns=None, seasons=None, league_ids=None, player_ids=None):
+    # קריאה של העמודות והמחיצות הנדרשות בלבד
+    filters = []
+    if seasons is not None:
+        filters.append(("Season", "in", [int(s) for s in seasons]))
+    if league_ids is not None:
+        filters.append(("LeagueID", "in", [int(l) for l in league_ids]))
+    if player_ids is not None:
+        filters.append(("Player_ID_API", "in", [int(p) for p in player_ids]))
+    df = pd.read_parquet(dataset_dir, columns=columns, filters=filters or None)
+    for col in ["Season", "LeagueID"]:
+        if col in df.columns:
+            df[col] = df[col].astype("int64")
+    return df.reset_index(drop=True)
+
+def latest_season(dataset_dir=PLAYERS_DATASET_DIR):
+    partitions = available_partitions(dataset_dir)
+    return max(season for season, _ in partitions) if partitions else None
+
+def load_latest_season(dataset_dir=PLAYERS_DATASET_DIR):
+    # מה שהאפליקציה טוענת: העונה האחרונה, רק העמודות שלה (None אם עדיין לא הורץ ingest)
+    season = latest_season(dataset_dir)
+    if season is None:
+        return None
+    return load_dataset(dataset_dir, columns=APP_PLAYER_COLUMNS, seasons=[season])
+
+def dataset_version(dataset_dir=PLAYERS_DATASET_DIR):
+    # משתנה בכל כתיבה של מחיצה - האפליקציה משווה אותו כדי לדעת מתי לטעון מחדש
+    version = []
+    for season, league_id in available_partitions(dataset_dir):
+        path = os.path.join(dataset_dir, f"Season={season}", f"LeagueID={league_id}", "part-0.parquet")
+        if os.path.exists(path):
+            stat = os.stat(path)
+            version.append((season, league_id, stat.st_mtime_ns, stat.st_size))
+    return tuple(version) or None
+
+def read_partition(dataset_dir, season, league_id):
+    path = os.path.join(dataset_dir, f"Season={season}", f"LeagueID={league_id}", "part-0.parquet")
+    if not os.path.exists(path):
+        return None
+    return pd.read_parquet(path)
+
+def _sync_state_path(state_dir, league_id, season):
+    return os.path.join(state_dir, f"league_{league_id}_season_{season}.json")
+
+def load_sync_state(state_dir, league_id, season):
+    path = _sync_state_path(state_dir, league_id, season)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return {int(page): info for page, info in json.load(f).get("pages", {}).items()}
+
+def save_sync_state(state_dir, league_id, season, pages):
+    os.makedirs(state_dir, exist_ok=True)
+    path = _sync_state_path(state_dir, league_id, season)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"pages": {str(page): info for page, info in sorted(pages.items())}}, f)
+    os.replace(tmp_path, path)
+
+def row_signatures(df):
+    # חתימה לכל Player_ID_API לפי הערכים עצמם: עמודות מספריות כ-float64 וטקסט כמחרוזת (חסר = ""),
+    # כך שסוג העמודה (int/float, object/string) שמשתנה בין parquet ל-API או בגלל ערך חסר לא נחשב כשינוי
+    columns = sorted(col for col in df.columns if col not in ("Season", "LeagueID", "Player_ID_API"))
+    normalized = pd.DataFrame(index=df.index)
+    for col in columns:
+        if pd.api.types.is_numeric_dtype(df[col]):
+            normalized[col] = df[col].astype("float64")
+        else:
+            normalized[col] = df[col].astype(object).where(df[col].notna(), "").astype(str)
+    hashes = pd.util.hash_pandas_object(normalized, index=False).to_numpy()
+    return dict(zip(df["Player_ID_API"].astype("int64").tolist(), hashes.tolist()))
+
+def sync_partition(league_id, season, dataset_dir=PLAYERS_DATASET_DIR, client=None, workers=4, state_dir=SYNC_STATE_DIR):
+    # סנכרון מצטבר של ליגה+עונה: עמודים שלא השתנו (304 או תוכן זהה) נלקחים מהמחיצה הקיימת,
+    # השורות מושוות לפי Player_ID_API, והמחיצה נכתבת רק אם משהו השתנה. מחזיר (מזהים ששונו/נוספו, מזהים שנמחקו)
+    previous = read_partition(dataset_dir, season, league_id)
+    previous_pages = load_sync_state(state_dir, league_id, season) if previous is not None else {}
+    pages = fetch_changed_pages(league_id, season, client=client, previous_pages=previous_pages, workers=workers)
+
+    frames = []
+    new_state = {}
+    for page in sorted(pages):
+        result = pages[page]
+        if result["data"] is None:
+            ids = previous_pages[page]["ids"]
+            frames.append(previous[previous["Player_ID_API"].isin(ids)].assign(Season=season, LeagueID=league_id))
+        else:
+            df = simplify_players(result["data"].get("response") or [])
+            df = to_app_schema(df, league_id, season) if not df.empty else df
+            ids = df["Player_ID_API"].dropna().astype("int64").tolist() if not df.empty else []
+            frames.append(df)
+        new_state[page] = {"etag": result["etag"], "hash": result["hash"], "ids": ids}
+    frames = [frame for frame in frames if not frame.empty]
+    current = dedupe_players(pd.concat(frames, ignore_index=True)) if frames else pd.DataFrame()
+    if current.empty:
+        # תשובה ריקה לא מוחקת מחיצה (כמו ב-ingest_players): המחיצה ומצב הסנכרון נשארים כמו שהם,
+        # כדי שלא ידווחו מחיקות שלא נכתבו והסנכרון הבא ישווה שוב מול הנתונים הקיימים
+        return [], []
+
+    old_signatures = row_signatures(previous) if previous is not None else {}
+    new_signatures = row_signatures(current)
+    changed = [pid for pid, signature in new_signatures.items() if old_signatures.get(pid) != signature]
+    removed = [pid for pid in old_signatures if pid not in new_signatures]
+    if changed or removed:
+        write_partition(current, dataset_dir, season, league_id)
+    save_sync_state(state_dir, league_id, season, new_state)
+    return changed, removed
+
+def refresh_derived_scores(player_ids, dataset_dir=PLAYERS_DATASET_DIR, fit_index_path=FIT_INDEX_PATH, result_cache_path=RESULT_CACHE_DB):
+    # אחרי סנכרון: הפרופילים נבנים מחדש (וקטורי וזול), אבל ציוני ההתאמה מחושבים מחדש רק לשחקנים שהשתנו,
+    # והתוצאות השמורות שלהם נמחקות ממטמון התוצאות. חייב לטעון בדיוק כמו app.py כדי שחתימת האינדקס תתאים
+    players = load_latest_season(dataset_dir)
+    if players is None or not player_ids:
+        return None
+    players.columns = players.columns.str.strip()
+    profiles = build_player_profiles(players).reset_index()
+    clubs = data_cache.load_csv_cached(CLUBS_CSV, data_cache.CLUB_DTYPES)
+    keys = [str(int(pid)) for pid in player_ids]
+    _, rebuilt = refresh_fit_index(profiles, clubs, keys, k=10, path=fit_index_path, key_column="Player_ID")
+    ResultCache(scoring_signature(clubs), path=result_cache_path).invalidate_players(keys)
+    return rebuilt
+
+def sync_players(league_ids, seasons, dataset_dir=PLAYERS_DATASET_DIR, client=None, workers=4, state_dir=SYNC_STATE_DIR):
+    client = client or ApiFootballClient()
+    changed_ids, removed_ids = set(), set()
+    for season in seasons:
+        for league_id in league_ids:
+            changed, removed = sync_partition(league_id, season, dataset_dir, client=client, workers=workers, state_dir=state_dir)
+            print(f"season {season} league {league_id}: {len(changed)} changed, {len(removed)} removed")
+            if season == latest_season(dataset_dir):
+                changed_ids.update(changed)
+                removed_ids.update(removed)
+    if changed_ids or removed_ids:
+        rebuilt = refresh_derived_scores(changed_ids | removed_ids, dataset_dir)
+        print("fit index rebuilt" if rebuilt else f"fit index updated for {len(changed_ids)} players")
+    return sorted(changed_ids), sorted(removed_ids)
+
+def player_season_history(player_id, dataset_dir=PLAYERS_DATASET_DIR, seasons=None):
+    # היסטוריית עונות לשחקן מתוך הדאטהסט המקומי - במקום שלוש קריאות API לכל שחקן
+    df = load_dataset(dataset_dir, seasons=seasons, player_ids=[player_id])
+    return df.sort_values("Season", ascending=False).reset_index(drop=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pull players for many leagues and seasons into a partitioned Parquet dataset.")
+    parser.add_argument("--leagues", type=int, nargs="+", default=list(LEAGUE_NAMES))
+    parser.add_argument("--seasons", type=int, nargs="+", required=True)
+    parser.add_argument("--out", default=PLAYERS_DATASET_DIR)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--incremental", action="store_true", help="only rewrite players whose stats changed since the last sync")
+    args = parser.parse_args()
+
+    if args.incremental:
+        sync_players(args.leagues, args.seasons, dataset_dir=args.out, workers=args.workers)
+    else:
+        ingest_players(args.leagues, args.seasons, dataset_dir=args.out, workers=args.workers)
@@ -0,0 +1,193 @@
+import os
+import io
+import json
+import queue
+import atexit
+import logging
+import time
+import random
+import pstats
+import cProfile
+import datetime
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+
+DATA_DIR = "ysp75-app"
+METRICS_FILE = os.path.join(DATA_DIR, "perf_metrics.jsonl")
+PROFILE_DIR = os.path.join(DATA_DIR, "profiles")
+# חלק מהריצות שיעברו cProfile אוטומטית בפרודקשן (0 = רק לפי בקשה מפאנל הדיבאג)
+PROFILE_SAMPLE_RATE = float(os.getenv("YSP_PROFILE_SAMPLE_RATE", "0"))
+METRICS_ENABLED = os.getenv("YSP_PERF_METRICS", "1") != "0"
+# קובץ המדדים מסובב (לקובץ .1 אחד) כשהוא עובר את הגודל הזה
+METRICS_MAX_BYTES = int(os.getenv("YSP_PERF_METRICS_MAX_BYTES", str(5 * 1024 * 1024)))
+# פאנל הדיבאג קורא רק את סוף הקובץ
+METRICS_TAIL_BYTES = 1024 * 1024
+
+_current_run = contextvars.ContextVar("perf_run", default=None)
+_metrics_lock = threading.Lock()
+# הרשומות נכתבות ברקע (כמו log_search) כדי שלא תהיה כתיבה לדיסק בכל rerun
+_pending_metrics = queue.Queue()
+_writer_thread = None
+_writer_lock = threading.Lock()
+
+class RunTimings:
+    # זמני השלבים של ריצה אחת של הסקריפט (rerun), לפי סדר הופעתם
+    def __init__(self, page, profile=False):
+        self.page = page
+        self.spans = []
+        self.started = time.perf_counter()
+        self.total_ms = None
+        self.profiler = cProfile.Profile() if profile else None
+        self.profile_text = None
+        self.profile_path = None
+
+    def stage_totals(self):
+        totals = {}
+        for name, elapsed_ms in self.spans:
+            totals[name] = totals.get(name, 0.0) + elapsed_ms
+        return totals
+
+def current_run():
+    return _current_run.get()
+
+def start_run(page, profile=False):
+    run = RunTimings(page, profile=profile or (PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE))
+    _current_run.set(run)
+    if run.profiler is not None:
+        run.profiler.enable()
+    return run
+
+@contextmanager
+def span(name):
+    # מדידת שלב; מחוץ לריצה פעילה (למשל בסקריפט batch) זה no-op זול
+    run = _current_run.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if run is not None:
+            run.spans.append((name, (time.perf_counter() - start) * 1000))
+
+def _save_profile(run):
+    run.profiler.disable()
+    stream = io.StringIO()
+    pstats.Stats(run.profiler, stream=stream).sort_stats("cumulative").print_stats(30)
+    run.profile_text = stream.getvalue()
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    run.profile_path = os.path.join(PROFILE_DIR, f"{run.page}-{stamp}.prof")
+    run.profiler.dump_stats(run.profile_path)
+
+def _append_metrics(lines, path):
+    with _metrics_lock:
+        if os.path.exists(path) and os.path.getsize(path) > METRICS_MAX_BYTES:
+            os.replace(path, path + ".1")
+        with open(path, "a", encoding="utf-8") as f:
+            f.writelines(lines)
+
+def _metrics_writer_loop():
+    while True:
+        path, line = _pending_metrics.get()
+        batch = [(path, line)]
+        while True:
+            try:
+                batch.append(_pending_metrics.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            for target in dict.fromkeys(p for p, _ in batch):
+                _append_metrics([l for p, l in batch if p == target], target)
+        except Exception:
+            logging.getLogger(__name__).exception("failed to write %d perf records", len(batch))
+        finally:
+            for _ in batch:
+                _pending_metrics.task_done()
+
+def _ensure_writer():
+    global _writer_thread
+    with _writer_lock:
+        if _writer_thread is None or not _writer_thread.is_alive():
+            _writer_thread = threading.Thread(target=_metrics_writer_loop, name="perf-metrics-writer", daemon=True)
+            _writer_thread.start()
+
+def flush_metrics():
+    _pending_metrics.join()
+
+atexit.register(flush_metrics)
+
+def finish_run(run, path=METRICS_FILE):
+    # נקרא מתוך finally: גם ריצה שנקטעה (חריגה, st.stop, rerun) נרשמת ו-cProfile תמיד מכובה
+    if run.total_ms is not None:
+        return run
+    run.total_ms = (time.perf_counter() - run.started) * 1000
+    try:
+        if run.profiler is not None:
+            _save_profile(run)
+    finally:
+        _current_run.set(None)
+    if METRICS_ENABLED:
+        record = {
+            "ts": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "page": run.page,
+            "total_ms": round(run.total_ms, 3),
+            "stages": {name: round(ms, 3) for name, ms in run.stage_totals().items()},
+            "profiled": run.profile_path,
+        }
+        _pending_metrics.put((path, json.dumps(record, ensure_ascii=False) + "\n"))
+        _ensure_writer()
+    return run
+
+def load_metrics(path=METRICS_FILE, limit=5000):
+    if not os.path.exists(path):
+        return []
+    with open(path, "rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        f.seek(max(0, size - METRICS_TAIL_BYTES))
+        if size > METRICS_TAIL_BYTES:
+            f.readline()  # שורה חלקית
+        lines = deque(f.read().decode("utf-8", errors="replace").splitlines(), maxlen=limit)
+    records = []
+    for line in lines:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue
+    return records
+
+def stage_percentiles(records, percentiles=(50, 95, 99)):
+    # אחוזוני זמן לכל שלב (וסך הריצה) על פני הריצות השמורות
+    import numpy as np
+
+    samples = {}
+    for record in records:
+        samples.setdefault("total", []).append(record["total_ms"])
+        for name, ms in record.get("stages", {}).items():
+            samples.setdefault(name, []).append(ms)
+    return {
+        name: {f"p{p}": float(np.percentile(values, p)) for p in percentiles} | {"runs": len(values)}
+        for name, values in samples.items()
+    }
+
+def show_perf_panel(run, container=None):
+    import pandas as pd
+    import streamlit as st
+
+    container = container or st.sidebar
+    container.markdown("---")
+    container.subheader("⏱️ זמני ריצה")
+    current = pd.DataFrame(
+        [{"שלב": name, "ms": round(ms, 1)} for name, ms in run.stage_totals().items()]
+        + [{"שלב": "סה\"כ", "ms": round(run.total_ms or 0, 1)}]
+    )
+    container.dataframe(current, hide_index=True)
+
+    history = stage_percentiles([r for r in load_metrics() if r.get("page") == run.page])
+    if history:
+        container.caption("אחוזונים על פני ריצות קודמות (ms)")
+        container.dataframe(pd.DataFrame(history).T.round(1))
+    if run.profile_text:
+        with container.expander("cProfile - 30 הפונקציות היקרות"):
+            st.code(run.profile_text)
+            st.caption(run.profile_path)
@@ -0,0 +1,66 @@
+import hashlib
+import numpy as np
+import pandas as pd
+from scoring import DEFAULT_LEAGUE_WEIGHT, LEAGUE_WEIGHTS, calculate_ysp_scores
+from search_index import fold_text
+
+# עמודות ספירה שמסוכמות על פני כל הליגות/הקבוצות של השחקן באותה עונה
+COUNT_COLUMNS = ["Min", "Gls", "Ast", "Tkl", "Int", "Clr", "Blocks", "Succ", "Carries", "KP", "xG", "xAG"]
+
+def player_id_for(name, age):
+    # מזהה יציב לשחקן: שם מנורמל + גיל (מבדיל בין שני שחקנים בשם "Rodri", ולא משתנה בין טעינות)
+    age_part = "" if pd.isna(age) else str(int(age))
+    return hashlib.sha1(f"{fold_text(name)}|{age_part}".encode("utf-8")).hexdigest()[:12]
+
+def assign_player_ids(df):
+    if "Player_ID_API" in df.columns:
+        return df["Player_ID_API"].astype("int64").astype(str)
+    return pd.Series(
+        [player_id_for(name, age) for name, age in zip(df["Player"].astype(str), df["Age"])],
+        index=df.index,
+    )
+
+def build_player_profiles(df):
+    # שורה אחת לשחקן: סכום הסטטיסטיקות מכל השורות (ליגות/קבוצות), משקל ליגה ממוצע לפי דקות ושיעורים ל-90 דקות
+    df = df.copy()
+    df["Player_ID"] = assign_player_ids(df)
+    count_columns = [col for col in COUNT_COLUMNS if col in df.columns]
+    df["_league_weight"] = df["Comp"].astype(str).str.strip().map(LEAGUE_WEIGHTS).fillna(DEFAULT_LEAGUE_WEIGHT)
+    df["_weighted_minutes"] = df["_league_weight"] * df["Min"]
+
+    # הליגה והעמדה מוצגות לפי השורה עם הכי הרבה דקות
+    primary = df.sort_values("Min", ascending=False, kind="stable").drop_duplicates("Player_ID")
+    primary = primary.set_index("Player_ID")[["Player", "Age", "Pos", "Comp"]]
+
+    grouped = df.groupby("Player_ID", sort=False)
+    totals = grouped[count_columns + ["_weighted_minutes", "_league_weight"]].sum()
+    stints = grouped.size()
+    # רק לשחקנים שהופיעו ביותר מליגה אחת צריך לחבר שמות ליגות
+    comp_pairs = pd.DataFrame({"Player_ID": df["Player_ID"], "Comp": df["Comp"].astype(str)}).drop_duplicates()
+    multi_league = comp_pairs[comp_pairs["Player_ID"].duplicated(keep=False)]
+    joined_leagues = multi_league.groupby("Player_ID", sort=False)["Comp"].agg(" / ".join)
+
+    profiles = primary.reindex(totals.index).join(totals[count_columns])
+    profiles["Leagues"] = profiles["Comp"].astype(str)
+    profiles.loc[joined_leagues.index, "Leagues"] = joined_leagues
+    profiles["Stints"] = stints
+    minutes = totals["Min"].to_numpy(dtype=np.float64)
+    profiles["League_Weight"] = np.where(
+        minutes > 0,
+        totals["_weighted_minutes"].to_numpy(dtype=np.float64) / np.where(minutes > 0, minutes, 1),
+        totals["_league_weight"].to_numpy(dtype=np.float64) / stints.to_numpy(),
+    )
+    for col in count_columns:
+        if col == "Min":
+            continue
+        profiles[f"{col}_p90"] = np.where(minutes > 0, profiles[col].to_numpy(dtype=np.float64) / np.where(minutes > 0, minutes, 1) * 90, 0.0)
+
+    # שם תצוגה ייחודי לחיפוש: שחקנים שונים עם אותו שם מקבלים את הגיל בסוגריים
+    names = profiles["Player"].astype(str)
+    duplicated = names.duplicated(keep=False)
+    ages = profiles["Age"].map(lambda age: "?" if pd.isna(age) else str(int(age)))
+    profiles["Display_Name"] = names.where(~duplicated, names + " (" + ages + ")")
+
+    profiles["YSP_Gross"] = calculate_ysp_scores(profiles)
+    profiles.index.name = "Player_ID"
+    return profiles
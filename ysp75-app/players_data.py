@@ -1,28 +1,220 @@
 import os
+import json
+import hashlib
+import time
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
 import pandas as pd
 
 API_KEY = os.getenv("API_FOOTBALL_KEY")
 HEADERS = {"x-apisports-key": API_KEY}
+API_BASE_URL = os.getenv("API_FOOTBALL_BASE_URL", "https://v3.football.api-sports.io")
+# מגבלת הקצב של התוכנית ב-API-Football (ברירת מחדל: התוכנית החינמית)
+REQUESTS_PER_MINUTE = float(os.getenv("API_FOOTBALL_REQUESTS_PER_MINUTE", "10"))
+MAX_RETRIES = 5
+BACKOFF_SECONDS = 2.0
+REQUEST_TIMEOUT = (5, 30)
+CHECKPOINT_DIR = os.path.join("ysp75-app", "api_checkpoints")
+# נקודות ביקורת ישנות מזה (מתחילת ההרצה שכתבה אותן) לא ממשיכים - עמודים ישנים ו-paging.total ישן לא יתערבבו בחדשים
+CHECKPOINT_TTL_SECONDS = float(os.getenv("API_FOOTBALL_CHECKPOINT_TTL_SECONDS", str(6 * 3600)))
 
-def fetch_players_from_api(league_id=39, season=2023):
-    url = "https://v3.football.api-sports.io/players"
-    players = []
-    page = 1
-
-    while True:
-        params = {"league": league_id, "season": season, "page": page}
-        response = requests.get(url, headers=HEADERS, params=params)
-        if response.status_code != 200:
-            raise Exception(f"API request failed with status {response.status_code}")
-        data = response.json()
-        if not data.get("response"):
-            break
-        players.extend(data["response"])
-        if page >= data["paging"]["total"]:
-            break
-        page += 1
+class RateLimiter:
+    # מחלק "תורים" ברווחים קבועים בין כל ה-threads כך שלא נחרוג מהקצב המותר
+    def __init__(self, requests_per_minute):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+class ApiFootballClient:
+    def __init__(self, base_url=API_BASE_URL, api_key=API_KEY, requests_per_minute=REQUESTS_PER_MINUTE,
+                 max_retries=MAX_RETRIES, backoff_seconds=BACKOFF_SECONDS):
+        self.base_url = base_url.rstrip("/")
+        self.session = requests.Session()
+        self.session.headers.update({"x-apisports-key": api_key or ""})
+        self.rate_limiter = RateLimiter(requests_per_minute)
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+
+    def _retry_delay(self, attempt, response=None):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return self.backoff_seconds * (2 ** attempt)
+
+    def get(self, path, params):
+        data, _ = self.get_conditional(path, params)
+        return data
+
+    def get_conditional(self, path, params, etag=None):
+        # בקשה עם If-None-Match: מחזיר (None, etag) אם השרת ענה 304 (לא השתנה), אחרת (data, etag חדש או None)
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        headers = {"If-None-Match": etag} if etag else None
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.wait()
+            response = None
+            try:
+                response = self.session.get(url, params=params, headers=headers, timeout=REQUEST_TIMEOUT)
+            except requests.RequestException:
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self._retry_delay(attempt))
+                continue
+            if response.status_code == 429 or response.status_code >= 500:
+                if attempt == self.max_retries:
+                    break
+                time.sleep(self._retry_delay(attempt, response))
+                continue
+            if response.status_code == 304:
+                return None, etag
+            if response.status_code != 200:
+                raise Exception(f"API request failed with status {response.status_code}")
+            data = response.json()
+            errors = data.get("errors")
+            if errors:
+                # API-Football מחזיר חריגת קצב כ-200 עם errors.rateLimit
+                if isinstance(errors, dict) and "rateLimit" in errors and attempt < self.max_retries:
+                    time.sleep(self._retry_delay(attempt, response))
+                    continue
+                raise Exception(f"API request failed: {errors}")
+            return data, response.headers.get("ETag")
+        raise Exception(f"API request failed with status {response.status_code} after {self.max_retries} retries")
+
+_default_client = None
+
+def get_default_client():
+    global _default_client
+    if _default_client is None:
+        _default_client = ApiFootballClient()
+    return _default_client
+
+def _checkpoint_path(checkpoint_dir, page):
+    return os.path.join(checkpoint_dir, f"page_{page:04d}.json")
+
+def _load_checkpoint(checkpoint_dir, page):
+    path = _checkpoint_path(checkpoint_dir, page)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _write_json_atomic(path, data):
+    # כתיבה לקובץ זמני והחלפה אטומית - קובץ חלקי לא יישאר על הדיסק אם התהליך נקטע
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+def _save_checkpoint(checkpoint_dir, page, data):
+    _write_json_atomic(_checkpoint_path(checkpoint_dir, page), data)
+
+def _prepare_checkpoints(checkpoint_dir, params, resume=True, ttl_seconds=CHECKPOINT_TTL_SECONDS):
+    # manifest.json מתעד את הפרמטרים ואת זמן תחילת ההרצה. ממשיכים רק מנקודות ביקורת של אותם פרמטרים
+    # שעדיין בתוקף; אחרת התיקייה מתרוקנת ומתחילה הרצה חדשה. מחזיר True אם ממשיכים הרצה קודמת.
+    manifest_path = os.path.join(checkpoint_dir, "manifest.json")
+    manifest = None
+    if resume and os.path.exists(manifest_path):
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except ValueError:
+            manifest = None
+    if (manifest is not None and manifest.get("params") == params
+            and time.time() - manifest.get("started_at", 0) <= ttl_seconds):
+        return True
+    shutil.rmtree(checkpoint_dir, ignore_errors=True)
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    _write_json_atomic(manifest_path, {"params": params, "started_at": time.time()})
+    return False
 
+def fetch_player_pages(league_id=39, season=2023, client=None, checkpoint_dir=None, workers=4, resume=True):
+    # עמוד 1 קובע את paging.total; שאר העמודים נמשכים במקביל. כל עמוד נשמר כנקודת ביקורת,
+    # כך שהרצה שנקטעה ממשיכה מהעמודים החסרים בלבד (אם היא מאותם פרמטרים ולא ישנה מ-CHECKPOINT_TTL_SECONDS).
+    client = client or get_default_client()
+    if checkpoint_dir is None:
+        checkpoint_dir = os.path.join(CHECKPOINT_DIR, f"league_{league_id}_season_{season}")
+    _prepare_checkpoints(checkpoint_dir, {"league": league_id, "season": season}, resume=resume)
+
+    def fetch_page(page):
+        data = _load_checkpoint(checkpoint_dir, page)
+        if data is None:
+            data = client.get("players", {"league": league_id, "season": season, "page": page})
+            _save_checkpoint(checkpoint_dir, page, data)
+        return data
+
+    first = fetch_page(1)
+    pages = {1: first}
+    total = int(first.get("paging", {}).get("total", 1) or 1)
+    if first.get("response") and total > 1:
+        failures = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(fetch_page, page): page for page in range(2, total + 1)}
+            for future in as_completed(futures):
+                try:
+                    pages[futures[future]] = future.result()
+                except Exception as e:
+                    failures.append((futures[future], e))
+        if failures:
+            failed_pages = sorted(page for page, _ in failures)
+            raise Exception(
+                f"API fetch failed for pages {failed_pages} (completed pages are saved in {checkpoint_dir}): {failures[0][1]}"
+            )
+    return [pages[page] for page in sorted(pages)], checkpoint_dir
+
+def page_hash(data):
+    # paging נכלל כדי שעמוד 1 זהה עם מספר עמודים חדש ייחשב כשינוי
+    content = {"paging": data.get("paging"), "response": data.get("response") or []}
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode("utf-8")).hexdigest()
+
+def fetch_changed_pages(league_id=39, season=2023, client=None, previous_pages=None, workers=4):
+    # משיכה מותנית לסנכרון מצטבר: previous_pages הוא {עמוד: {"etag", "hash", ...}} מהסנכרון הקודם.
+    # מחזיר {עמוד: {"data": תוכן או None אם לא השתנה, "etag", "hash"}} - עמוד שענה 304 או שתוכנו זהה לא יפוענח שוב
+    client = client or get_default_client()
+    previous_pages = previous_pages or {}
+
+    def fetch_page(page):
+        previous = previous_pages.get(page, {})
+        data, etag = client.get_conditional(
+            "players", {"league": league_id, "season": season, "page": page}, etag=previous.get("etag")
+        )
+        if data is None:
+            return {"data": None, "etag": etag, "hash": previous.get("hash"), "total": None}
+        digest = page_hash(data)
+        total = int(data.get("paging", {}).get("total", 1) or 1)
+        if digest == previous.get("hash"):
+            data = None
+        return {"data": data, "etag": etag, "hash": digest, "total": total}
+
+    first = fetch_page(1)
+    pages = {1: first}
+    # עמוד 1 שלא השתנה לא מחזיר paging - משתמשים במספר העמודים מהסנכרון הקודם
+    total = first["total"] or max(previous_pages, default=1)
+    if total > 1:
+        failures = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(fetch_page, page): page for page in range(2, total + 1)}
+            for future in as_completed(futures):
+                try:
+                    pages[futures[future]] = future.result()
+                except Exception as e:
+                    failures.append((futures[future], e))
+        if failures:
+            raise Exception(f"API fetch failed for pages {sorted(page for page, _ in failures)}: {failures[0][1]}")
+    return pages
+
+def simplify_players(players):
     simplified_players = []
     for p in players:
         player = p["player"]
@@ -43,23 +235,37 @@ def fetch_players_from_api(league_id=39, season=2023):
             "Comp": stats.get("league", {}).get("name"),
             "Player_ID_API": player.get("id"),
         })
-
     return pd.DataFrame(simplified_players)
 
+def fetch_players_from_api(league_id=39, season=2023, client=None, checkpoint_dir=None, workers=4, keep_checkpoints=False,
+                           resume=True):
+    pages, checkpoint_dir = fetch_player_pages(
+        league_id, season, client=client, checkpoint_dir=checkpoint_dir, workers=workers, resume=resume
+    )
+
+    players = []
+    for data in pages:
+        players.extend(data.get("response") or [])
+
+    df = simplify_players(players)
+    if not keep_checkpoints:
+        # משיכה שהושלמה לא צריכה המשך; ההרצה הבאה תמשוך נתונים עדכניים
+        shutil.rmtree(checkpoint_dir, ignore_errors=True)
+    return df
+
 
-def fetch_player_stats_last_3_seasons(player_id, league_id=39, current_season=2023):
+def fetch_player_stats_last_3_seasons(player_id, league_id=39, current_season=2023, client=None):
+    client = client or get_default_client()
     seasons = [current_season, current_season-1, current_season-2]
     stats_list = []
 
     for season in seasons:
-        url = "https://v3.football.api-sports.io/players"
         params = {"id": player_id, "league": league_id, "season": season}
-        response = requests.get(url, headers=HEADERS, params=params)
-
-        if response.status_code != 200:
+        try:
+            data = client.get("players", params)
+        except Exception:
             continue
 
-        data = response.json()
         if not data["response"]:
             continue
 
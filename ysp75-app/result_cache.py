@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import closing
+import pandas as pd
+from scoring import FIT_WEIGHTS, YSP_BENCHMARKS, LEAGUE_WEIGHTS, DEFAULT_LEAGUE_WEIGHT
+
+DATA_DIR = "ysp75-app"
+RESULT_CACHE_DB = os.path.join(DATA_DIR, "result_cache.db")
+# מספר התוצאות שנשמרות בזיכרון התהליך (משותף לכל הסשנים); הישנות ביותר בשימוש נזרקות ראשונות
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "5000"))
+# שמירה גם ב-SQLite, כדי שהתוצאות ישרדו הפעלה מחדש של התהליך
+RESULT_CACHE_ON_DISK = os.getenv("RESULT_CACHE_ON_DISK", "1") != "0"
+# גבול לטבלה בדיסק: שורות של hash ישן או של גרסה אחרת לא נקראות שוב, ולכן נמחקות לפי גיל (stored_at) ולא לפי גרסה,
+# כדי ששתי גרסאות של האפליקציה שרצות במקביל על אותו קובץ לא ימחקו זו לזו
+RESULT_CACHE_MAX_DISK_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_DISK_ENTRIES", "50000"))
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+# גיזום הדיסק רץ בפתיחה ואחרי כל כמה כתיבות, לא בכל put
+PRUNE_EVERY_PUTS = 200
+
+def scoring_signature(*frames):
+    # חתימת הנוסחאות (כל המשקלים) והטבלאות שמשותפות לכל השחקנים - למשל טבלת המועדונים
+    digest = hashlib.sha256(json.dumps(
+        [FIT_WEIGHTS, YSP_BENCHMARKS, LEAGUE_WEIGHTS, DEFAULT_LEAGUE_WEIGHT], sort_keys=True
+    ).encode())
+    for frame in frames:
+        digest.update(",".join(map(str, frame.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def row_hashes(df):
+    # חתימת תוכן לכל שורה (לפי האינדקס): שחקן שהנתונים שלו השתנו מקבל מפתח חדש, והשאר ממשיכים לפגוע במטמון
+    return dict(zip(df.index, (format(h, "016x") for h in pd.util.hash_pandas_object(df, index=True).to_numpy())))
+
+class ResultCache:
+    # מטמון LRU חסום לתוצאות לפי שחקן. מפתח הוא tuple שמתחיל ב-(סוג, שחקן, ...), ומשויך לגרסה (scoring_signature);
+    # בדיסק נשמרות לכל היותר max_disk_entries השורות החדשות ביותר, ושורות ישנות מ-ttl_seconds נמחקות
+    def __init__(self, version, max_entries=RESULT_CACHE_MAX_ENTRIES, path=None,
+                 max_disk_entries=RESULT_CACHE_MAX_DISK_ENTRIES, ttl_seconds=RESULT_CACHE_TTL_SECONDS):
+        self.version = version
+        self.max_entries = max_entries
+        self.path = path
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+        self._puts_since_prune = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if path:
+            self._ensure_db()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _ensure_db(self):
+        with closing(self._connect()) as conn:
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS results ("
+                    "key TEXT PRIMARY KEY, "
+                    "version TEXT NOT NULL, "
+                    "player TEXT NOT NULL, "
+                    "value TEXT NOT NULL, "
+                    "stored_at REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS results_player ON results (player)")
+                conn.execute("CREATE INDEX IF NOT EXISTS results_stored_at ON results (stored_at)")
+        self.prune()
+
+    def prune(self):
+        # מחיקת שורות שפג תוקפן, ואז הישנות ביותר מעבר לגבול - בלי קשר לגרסה שכתבה אותן
+        if not self.path:
+            return 0
+        with closing(self._connect()) as conn:
+            with conn:
+                removed = conn.execute("DELETE FROM results WHERE stored_at < ?", (time.time() - self.ttl_seconds,)).rowcount
+                removed += conn.execute(
+                    "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk_entries,),
+                ).rowcount
+        return removed
+
+    def _disk_key(self, key):
+        return json.dumps([self.version, *key], default=str)
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        if self.path:
+            with closing(self._connect()) as conn:
+                row = conn.execute("SELECT value FROM results WHERE key = ?", (self._disk_key(key),)).fetchone()
+            if row is not None:
+                value = json.loads(row[0])
+                with self._lock:
+                    self.disk_hits += 1
+                self._remember(key, value)
+                return value
+        with self._lock:
+            self.misses += 1
+        return default
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def put(self, key, value):
+        self._remember(key, value)
+        if self.path:
+            with closing(self._connect()) as conn:
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO results (key, version, player, value, stored_at) VALUES (?, ?, ?, ?, ?)",
+                        (self._disk_key(key), self.version, str(key[1]), json.dumps(value, default=str), time.time()),
+                    )
+            with self._lock:
+                self._puts_since_prune += 1
+                due = self._puts_since_prune >= PRUNE_EVERY_PUTS
+                if due:
+                    self._puts_since_prune = 0
+            if due:
+                self.prune()
+        return value
+
+    def get_or_compute(self, key, compute):
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = self.put(key, compute())
+        return value
+
+    def invalidate_players(self, player_keys):
+        # מחיקת כל התוצאות של השחקנים האלה (בזיכרון ובדיסק)
+        players = {str(player) for player in player_keys}
+        with self._lock:
+            for key in [key for key in self._entries if str(key[1]) in players]:
+                del self._entries[key]
+        if self.path and players:
+            with closing(self._connect()) as conn:
+                with conn:
+                    conn.executemany("DELETE FROM results WHERE player = ?", [(player,) for player in players])
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 3) if lookups else None,
+            }
@@ -0,0 +1,455 @@
+# פונקציות החישוב (YSP-75 והתאמה למועדון) ללא תלות ב-streamlit או ברשת - מיובא גם מ-batch_score.py ומתהליכי עבודה
+import numpy as np
+
+FIT_WEIGHTS = {
+    "style": 0.20,
+    "pressing": 0.15,
+    "def_line": 0.10,
+    "xg_match": 0.15,
+    "pass_match": 0.10,
+    "formation_role": 0.15,
+    "age_dynamics": 0.05,
+    "personal_style": 0.05,
+    "roi_factor": 0.05
+}
+
+YSP_BENCHMARKS = {
+    "GK": {"Min": 3000, "Clr": 30, "Tkl": 10, "Blocks": 15},
+    "DF": {"Tkl": 50, "Int": 50, "Clr": 120, "Blocks": 30, "Min": 3000, "Gls": 3, "Ast": 2},
+    "MF": {"Gls": 10, "Ast": 10, "Succ": 50, "KP": 50, "Min": 3000},
+    "FW": {"Gls": 20, "Ast": 15, "Succ": 40, "KP": 40, "Min": 3000}
+}
+
+LEAGUE_WEIGHTS = {
+    "eng Premier League": 1.00,
+    "es La Liga": 0.98,
+    "de Bundesliga": 0.96,
+    "it Serie A": 0.95,
+    "fr Ligue 1": 0.93
+}
+DEFAULT_LEAGUE_WEIGHT = 0.9
+
+def match_text(query, text):
+    return query.lower() in str(text).lower()
+
+def calculate_fit_score(player_row, club_row, manual_market_value=None):
+    score = 0
+    weights = FIT_WEIGHTS
+
+    position = str(player_row["Pos"])
+    minutes = player_row["Min"]
+    goals = player_row["Gls"]
+    assists = player_row["Ast"]
+    dribbles = player_row["Succ"]
+    key_passes = player_row["KP"]
+    xg = player_row.get("xG", 0)
+    xag = player_row.get("xAG", 0)
+    age = player_row["Age"]
+    market_value = player_row.get("MarketValue", 0)
+    future_value = player_row.get("FutureValue", 0)
+
+    if club_row is not None:
+        formation = club_row["Common Formation"]
+        style = club_row["Playing Style"]
+        press = club_row["Pressing Style"]
+        def_line = club_row["Defensive Line Depth"]
+        pass_acc = club_row["Pass Accuracy (%)"]
+        team_xg = club_row["Team xG per Match"]
+    else:
+        formation = ""
+        style = ""
+        press = ""
+        def_line = ""
+        pass_acc = 0
+        team_xg = 0
+
+    style_score = 50
+    if "Attacking" in style and "FW" in position:
+        style_score = 100
+    elif "Balanced" in style and "MF" in position:
+        style_score = 100
+    elif "Low Block" in style and "DF" in position:
+        style_score = 90
+    score += style_score * weights["style"]
+
+    press_score = 50
+    if "High Press" in press and "FW" in position:
+        press_score = 100
+    elif "Mid Block" in press and "MF" in position:
+        press_score = 80
+    score += press_score * weights["pressing"]
+
+    def_score = 50
+    if "High" in def_line and "DF" in position:
+        def_score = 100
+    elif "Medium" in def_line and "MF" in position:
+        def_score = 80
+    score += def_score * weights["def_line"]
+
+    xg_score = 50
+    if team_xg >= 1.8 and "FW" in position and goals >= 5:
+        xg_score = 100
+    elif team_xg <= 1.2 and "DF" in position:
+        xg_score = 100
+    elif team_xg >= 1.4 and "MF" in position:
+        xg_score = 80
+    score += xg_score * weights["xg_match"]
+
+    pass_score = 50
+    try:
+        player_pass_style = (key_passes + dribbles) / (minutes / 90 + 1e-6)
+        if pass_acc >= 87 and player_pass_style >= 2.5:
+            pass_score = 100
+        elif pass_acc <= 82 and player_pass_style < 1.5:
+            pass_score = 90
+        elif pass_acc >= 85 and player_pass_style >= 1.5:
+            pass_score = 80
+    except:
+        pass
+    score += pass_score * weights["pass_match"]
+
+    form_score = 50
+    if "4-3-3" in formation and "FW" in position:
+        form_score = 100
+    elif "4-2-3-1" in formation and "MF" in position:
+        form_score = 100
+    elif "3-5-2" in formation and "DF" in position:
+        form_score = 100
+    score += form_score * weights["formation_role"]
+
+    age_score = 50
+    if age <= 20 and "Attacking" in style:
+        age_score = 100
+    elif age <= 23:
+        age_score = 80
+    score += age_score * weights["age_dynamics"]
+
+    personal_score = 50
+    personal_index = ((goals + assists) + dribbles * 0.5 + key_passes * 0.5 + xg * 2 + xag) / (minutes / 90 + 1e-6)
+    if personal_index >= 3.5:
+        personal_score = 100
+    elif personal_index >= 2.0:
+        personal_score = 80
+    elif personal_index <= 1.0:
+        personal_score = 60
+    score += personal_score * weights["personal_style"]
+
+    roi_score = 50
+    try:
+        base_value = manual_market_value if manual_market_value is not None else market_value
+        if base_value > 0 and future_value > 0:
+            roi = (future_value - base_value) / base_value
+            if roi >= 1.0:
+                roi_score = 100
+            elif roi >= 0.5:
+                roi_score = 80
+            elif roi >= 0.2:
+                roi_score = 65
+        score += roi_score * weights["roi_factor"]
+    except:
+        pass
+
+    return round(min(score, 100), 2)
+
+# מדד YSP-75 משוקלל: 80% ביצועים גולמיים ו-20% שווי שוק (עד 220 מיליון אירו). עובד גם על מערכים
+def calculate_weighted_ysp(ysp_gross, manual_market_value=None):
+    if manual_market_value is None:
+        return ysp_gross
+    return np.minimum(
+        100,
+        ysp_gross * 0.8 +  # משקל גבוה יותר לביצועים הגולמיים
+        (manual_market_value / 220) * 20  # משקל לשווי שוק עם מקסימום של 220 מיליון אירו
+    )
+
+# שורת DataFrame (iloc/loc) מחזירה סקלרים של NumPy, ועליהם round() של הפונקציות הסקלריות הוא np.round -
+# לכן גם המסלול הווקטורי מעגל עם np.round כדי לקבל תוצאה זהה
+def _round2(values):
+    return np.round(np.asarray(values, dtype=np.float64), 2)
+
+def _text_column(df, column):
+    if column not in df:
+        return np.full(len(df), "", dtype=object)
+    return df[column].astype(str).to_numpy(dtype=object)
+
+def _contains(values, token):
+    return np.array([token in v for v in values], dtype=bool)
+
+def _numeric_column(df, column, default=0.0):
+    if column not in df:
+        return np.full(len(df), default, dtype=np.float64)
+    return df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+
+# מטריצת ציוני התאמה (שחקנים x מועדונים), זהה ל-calculate_fit_score לכל זוג.
+# manual_market_values: None, ערך יחיד לכל השחקנים, או מערך לפי שחקן (NaN = אין ערך ידני)
+def calculate_fit_score_matrix(players_df, clubs_df, manual_market_values=None):
+    weights = FIT_WEIGHTS
+
+    position = _text_column(players_df, "Pos")
+    is_fw = _contains(position, "FW")[:, None]
+    is_mf = _contains(position, "MF")[:, None]
+    is_df = _contains(position, "DF")[:, None]
+    minutes = _numeric_column(players_df, "Min")
+    goals = _numeric_column(players_df, "Gls")
+    assists = _numeric_column(players_df, "Ast")
+    dribbles = _numeric_column(players_df, "Succ")
+    key_passes = _numeric_column(players_df, "KP")
+    xg = _numeric_column(players_df, "xG")
+    xag = _numeric_column(players_df, "xAG")
+    age = _numeric_column(players_df, "Age")[:, None]
+    market_value = _numeric_column(players_df, "MarketValue")
+    future_value = _numeric_column(players_df, "FutureValue")
+
+    formation = _text_column(clubs_df, "Common Formation")
+    style = _text_column(clubs_df, "Playing Style")
+    press = _text_column(clubs_df, "Pressing Style")
+    def_line = _text_column(clubs_df, "Defensive Line Depth")
+    pass_acc = _numeric_column(clubs_df, "Pass Accuracy (%)")[None, :]
+    team_xg = _numeric_column(clubs_df, "Team xG per Match")[None, :]
+    attacking = _contains(style, "Attacking")[None, :]
+
+    shape = (len(position), len(formation))
+
+    def pick(conditions, choices, default=50.0):
+        return np.select(
+            [np.broadcast_to(c, shape) for c in conditions],
+            choices,
+            default=default,
+        )
+
+    style_score = pick(
+        [attacking & is_fw, _contains(style, "Balanced")[None, :] & is_mf, _contains(style, "Low Block")[None, :] & is_df],
+        [100.0, 100.0, 90.0],
+    )
+    score = style_score * weights["style"]
+
+    press_score = pick(
+        [_contains(press, "High Press")[None, :] & is_fw, _contains(press, "Mid Block")[None, :] & is_mf],
+        [100.0, 80.0],
+    )
+    score = score + press_score * weights["pressing"]
+
+    def_score = pick(
+        [_contains(def_line, "High")[None, :] & is_df, _contains(def_line, "Medium")[None, :] & is_mf],
+        [100.0, 80.0],
+    )
+    score = score + def_score * weights["def_line"]
+
+    xg_score = pick(
+        [(team_xg >= 1.8) & is_fw & (goals >= 5)[:, None], (team_xg <= 1.2) & is_df, (team_xg >= 1.4) & is_mf],
+        [100.0, 100.0, 80.0],
+    )
+    score = score + xg_score * weights["xg_match"]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        player_pass_style = ((key_passes + dribbles) / (minutes / 90 + 1e-6))[:, None]
+    pass_score = pick(
+        [(pass_acc >= 87) & (player_pass_style >= 2.5), (pass_acc <= 82) & (player_pass_style < 1.5), (pass_acc >= 85) & (player_pass_style >= 1.5)],
+        [100.0, 90.0, 80.0],
+    )
+    score = score + pass_score * weights["pass_match"]
+
+    form_score = pick(
+        [_contains(formation, "4-3-3")[None, :] & is_fw, _contains(formation, "4-2-3-1")[None, :] & is_mf, _contains(formation, "3-5-2")[None, :] & is_df],
+        [100.0, 100.0, 100.0],
+    )
+    score = score + form_score * weights["formation_role"]
+
+    age_score = pick([(age <= 20) & attacking, age <= 23], [100.0, 80.0])
+    score = score + age_score * weights["age_dynamics"]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        personal_index = (((goals + assists) + dribbles * 0.5 + key_passes * 0.5 + xg * 2 + xag) / (minutes / 90 + 1e-6))[:, None]
+    personal_score = pick([personal_index >= 3.5, personal_index >= 2.0, personal_index <= 1.0], [100.0, 80.0, 60.0])
+    score = score + personal_score * weights["personal_style"]
+
+    if manual_market_values is None:
+        base_value = market_value
+    else:
+        manual = np.broadcast_to(np.asarray(manual_market_values, dtype=np.float64), market_value.shape)
+        base_value = np.where(np.isnan(manual), market_value, manual)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        roi = (future_value - base_value) / base_value
+    has_values = (base_value > 0) & (future_value > 0)
+    roi_score = np.select(
+        [has_values & (roi >= 1.0), has_values & (roi >= 0.5), has_values & (roi >= 0.2)],
+        [100.0, 80.0, 65.0],
+        default=50.0,
+    )[:, None]
+    score = score + roi_score * weights["roi_factor"]
+
+    return _round2(np.minimum(score, 100))
+
+# k המועדונים המובילים לכל שורה, בסדר יציב כמו sort של פייתון
+def top_club_fits(fit_scores, clubs, k=10):
+    fit_scores = np.atleast_2d(fit_scores)
+    clubs = np.asarray(clubs, dtype=object)
+    order = np.argsort(-fit_scores, axis=1, kind="stable")[:, :k]
+    return [
+        list(zip(clubs[row_order].tolist(), fit_scores[i, row_order].tolist()))
+        for i, row_order in enumerate(order)
+    ]
+
+def calculate_ysp_score(row):
+    position = str(row["Pos"])
+    minutes = row["Min"]
+    goals = row["Gls"]
+    assists = row["Ast"]
+    dribbles = row["Succ"]
+    key_passes = row["KP"]
+    tackles = row["Tkl"]
+    interceptions = row["Int"]
+    clearances = row["Clr"]
+    blocks = row["Blocks"]
+    age = row["Age"]
+    league = row["Comp"]
+
+    benchmarks = YSP_BENCHMARKS
+    league_weights = LEAGUE_WEIGHTS
+
+    ysp_score = 0
+    if "GK" in position:
+        bm = benchmarks["GK"]
+        ysp_score = (
+            (minutes / bm["Min"]) * 40 +
+            (clearances / bm["Clr"]) * 20 +
+            (tackles / bm["Tkl"]) * 20 +
+            (blocks / bm["Blocks"]) * 20
+        )
+    elif "DF" in position:
+        bm = benchmarks["DF"]
+        ysp_score = (
+            (tackles / bm["Tkl"]) * 18 +
+            (interceptions / bm["Int"]) * 18 +
+            (clearances / bm["Clr"]) * 18 +
+            (blocks / bm["Blocks"]) * 10 +
+            (minutes / bm["Min"]) * 10 +
+            (goals / bm["Gls"]) * 13 +
+            (assists / bm["Ast"]) * 13
+        )
+    elif "MF" in position:
+        bm = benchmarks["MF"]
+        ysp_score = (
+            (goals / bm["Gls"]) * 20 +
+            (assists / bm["Ast"]) * 20 +
+            (dribbles / bm["Succ"]) * 20 +
+            (key_passes / bm["KP"]) * 20 +
+            (minutes / bm["Min"]) * 20
+        )
+    elif "FW" in position:
+        bm = benchmarks["FW"]
+        ysp_score = (
+            (goals / bm["Gls"]) * 30 +
+            (assists / bm["Ast"]) * 25 +
+            (dribbles / bm["Succ"]) * 15 +
+            (key_passes / bm["KP"]) * 15 +
+            (minutes / bm["Min"]) * 15
+        )
+    else:
+        ysp_score = (goals * 3 + assists * 2 + minutes / 250)
+
+    if minutes > 0:
+        contribution_per_90 = ((goals + assists + dribbles * 0.5 + key_passes * 0.5) / minutes) * 90
+        if contribution_per_90 >= 1.2:
+            ysp_score += 15
+        elif contribution_per_90 >= 0.9:
+            ysp_score += 10
+        elif contribution_per_90 >= 0.6:
+            ysp_score += 5
+
+    if age <= 20:
+        ysp_score *= 1.1
+    elif age <= 23:
+        ysp_score *= 1.05
+
+    # בפרופיל שחקן מכמה ליגות המשקל כבר ממוצע לפי דקות (League_Weight)
+    if "League_Weight" in row:
+        league_weight = row["League_Weight"]
+    else:
+        league_weight = league_weights.get(league.strip(), DEFAULT_LEAGUE_WEIGHT)
+    ysp_score *= league_weight
+    return min(round(ysp_score, 2), 100)
+# גרסה וקטורית של calculate_ysp_score לכל שורות ה-DataFrame בבת אחת (תוצאה זהה לכל שורה)
+def calculate_ysp_scores(df):
+    position = _text_column(df, "Pos")
+    minutes = _numeric_column(df, "Min")
+    goals = _numeric_column(df, "Gls")
+    assists = _numeric_column(df, "Ast")
+    dribbles = _numeric_column(df, "Succ")
+    key_passes = _numeric_column(df, "KP")
+    tackles = _numeric_column(df, "Tkl")
+    interceptions = _numeric_column(df, "Int")
+    clearances = _numeric_column(df, "Clr")
+    blocks = _numeric_column(df, "Blocks")
+    age = _numeric_column(df, "Age")
+    league = df["Comp"].astype(str).str.strip()
+
+    is_gk = _contains(position, "GK")
+    is_df = ~is_gk & _contains(position, "DF")
+    is_mf = ~is_gk & ~is_df & _contains(position, "MF")
+    is_fw = ~is_gk & ~is_df & ~is_mf & _contains(position, "FW")
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bm = YSP_BENCHMARKS["GK"]
+        gk_score = (
+            (minutes / bm["Min"]) * 40 +
+            (clearances / bm["Clr"]) * 20 +
+            (tackles / bm["Tkl"]) * 20 +
+            (blocks / bm["Blocks"]) * 20
+        )
+        bm = YSP_BENCHMARKS["DF"]
+        df_score = (
+            (tackles / bm["Tkl"]) * 18 +
+            (interceptions / bm["Int"]) * 18 +
+            (clearances / bm["Clr"]) * 18 +
+            (blocks / bm["Blocks"]) * 10 +
+            (minutes / bm["Min"]) * 10 +
+            (goals / bm["Gls"]) * 13 +
+            (assists / bm["Ast"]) * 13
+        )
+        bm = YSP_BENCHMARKS["MF"]
+        mf_score = (
+            (goals / bm["Gls"]) * 20 +
+            (assists / bm["Ast"]) * 20 +
+            (dribbles / bm["Succ"]) * 20 +
+            (key_passes / bm["KP"]) * 20 +
+            (minutes / bm["Min"]) * 20
+        )
+        bm = YSP_BENCHMARKS["FW"]
+        fw_score = (
+            (goals / bm["Gls"]) * 30 +
+            (assists / bm["Ast"]) * 25 +
+            (dribbles / bm["Succ"]) * 15 +
+            (key_passes / bm["KP"]) * 15 +
+            (minutes / bm["Min"]) * 15
+        )
+        other_score = goals * 3 + assists * 2 + minutes / 250
+        ysp_score = np.select([is_gk, is_df, is_mf, is_fw], [gk_score, df_score, mf_score, fw_score], default=other_score)
+
+        contribution_per_90 = ((goals + assists + dribbles * 0.5 + key_passes * 0.5) / minutes) * 90
+    played = minutes > 0
+    bonus = np.select(
+        [played & (contribution_per_90 >= 1.2), played & (contribution_per_90 >= 0.9), played & (contribution_per_90 >= 0.6)],
+        [15.0, 10.0, 5.0],
+        default=0.0,
+    )
+    ysp_score = ysp_score + bonus
+
+    ysp_score = np.select([age <= 20, age <= 23], [ysp_score * 1.1, ysp_score * 1.05], default=ysp_score)
+
+    if "League_Weight" in df.columns:
+        league_weight = df["League_Weight"].to_numpy(dtype=np.float64)
+    else:
+        league_weight = league.map(LEAGUE_WEIGHTS).fillna(DEFAULT_LEAGUE_WEIGHT).to_numpy(dtype=np.float64)
+    ysp_score = ysp_score * league_weight
+    return np.minimum(_round2(ysp_score), 100)
+
+# what-if: מדד משוקלל וציוני התאמה לאורך טווח שלם של שווי שוק בבת אחת.
+# player_df הוא DataFrame של שורה אחת; מחזיר מערך משוקלל (לפי שווי) ומטריצת התאמה (שווי x מועדון)
+def market_value_sweep(player_df, clubs_df, ysp_gross, market_values, future_value=None):
+    market_values = np.asarray(market_values, dtype=np.float64)
+    weighted = calculate_weighted_ysp(ysp_gross, market_values)
+    players = player_df.iloc[np.zeros(len(market_values), dtype=np.intp)].reset_index(drop=True)
+    if future_value is not None:
+        players["FutureValue"] = future_value
+    fits = calculate_fit_score_matrix(players, clubs_df, manual_market_values=market_values)
+    return weighted, fits
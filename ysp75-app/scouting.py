@@ -0,0 +1,101 @@
+import heapq
+import numpy as np
+import pandas as pd
+from scoring import calculate_fit_score_matrix, calculate_weighted_ysp, calculate_ysp_scores
+
+POSITION_OPTIONS = ["GK", "DF", "MF", "FW"]
+
+def filter_players(players_df, positions=None, min_age=None, max_age=None, leagues=None, min_minutes=None):
+    mask = np.ones(len(players_df), dtype=bool)
+    if positions:
+        pos = players_df["Pos"].astype(str)
+        mask &= np.logical_or.reduce([pos.str.contains(p, regex=False).to_numpy() for p in positions])
+    age = players_df["Age"].to_numpy(dtype=np.float64, na_value=np.nan)
+    if min_age is not None:
+        mask &= age >= min_age
+    if max_age is not None:
+        mask &= age <= max_age
+    if leagues:
+        mask &= players_df["Comp"].astype(str).isin(list(leagues)).to_numpy()
+    if min_minutes is not None:
+        mask &= players_df["Min"].to_numpy(dtype=np.float64) >= min_minutes
+    return mask
+
+def selected_age_bounds(ages, selected):
+    # קצה של הסליידר שנשאר בערך ברירת המחדל אינו מסנן - אחרת שחקנים בלי גיל (NaN) נופלים מכל רשימה
+    min_age, max_age = selected
+    return (min_age if min_age > int(ages.min()) else None, max_age if max_age < int(ages.max()) else None)
+
+def top_players_for_club(players_df, club_row, n=20, positions=None, min_age=None, max_age=None,
+                         leagues=None, manual_market_value=None, min_minutes=None):
+    # דירוג השחקנים המתאימים ביותר למועדון: ציון התאמה ואז YSP-75 משוקלל.
+    # הציונים מחושבים וקטורית על השחקנים שעברו את הסינון, ו-heap חסום בגודל n בוחר את המובילים.
+    mask = filter_players(players_df, positions, min_age, max_age, leagues, min_minutes)
+    candidates = players_df[mask]
+    if candidates.empty:
+        return candidates.assign(Fit_Score=pd.Series(dtype=float), YSP_Weighted=pd.Series(dtype=float))
+
+    club_frame = club_row.to_frame().T if isinstance(club_row, pd.Series) else club_row
+    fit = calculate_fit_score_matrix(candidates, club_frame, manual_market_values=manual_market_value)[:, 0]
+    if "YSP_Gross" in candidates.columns:
+        ysp_gross = candidates["YSP_Gross"].to_numpy(dtype=np.float64)
+    else:
+        ysp_gross = calculate_ysp_scores(candidates)
+    ysp = np.round(calculate_weighted_ysp(ysp_gross, manual_market_value), 2)
+
+    # רק שחקנים שציון ההתאמה שלהם לפחות כמו ה-n הגבוה ביותר יכולים להיכנס לתוצאה
+    positions_in_frame = np.arange(len(fit))
+    if len(fit) > n:
+        threshold = np.partition(fit, len(fit) - n)[len(fit) - n]
+        positions_in_frame = np.flatnonzero(fit >= threshold)
+    best = heapq.nlargest(n, positions_in_frame.tolist(), key=lambda i: (fit[i], ysp[i], -i))
+
+    result = candidates.iloc[best].copy()
+    result["Fit_Score"] = fit[best]
+    result["YSP_Weighted"] = ysp[best]
+    return result.reset_index(drop=True)
+
+def show_club_scouting(players_df, clubs_df):
+    import streamlit as st
+
+    st.title("סקאוטינג לפי מועדון")
+
+    selected_club = st.selectbox("בחר מועדון:", sorted(clubs_df["Club"].astype(str).unique()))
+    club_row = clubs_df[clubs_df["Club"] == selected_club].iloc[0]
+    st.write(
+        f"מערך: {club_row['Common Formation']} | סגנון: {club_row['Playing Style']} | "
+        f"לחץ: {club_row['Pressing Style']} | קו הגנה: {club_row['Defensive Line Depth']}"
+    )
+
+    col1, col2 = st.columns(2)
+    with col1:
+        positions = st.multiselect("עמדות:", POSITION_OPTIONS, default=[])
+        leagues = st.multiselect("ליגות:", sorted(players_df["Comp"].dropna().astype(str).unique()), default=[])
+    with col2:
+        ages = players_df["Age"].dropna()
+        min_age, max_age = selected_age_bounds(
+            ages, st.slider("טווח גילאים:", int(ages.min()), int(ages.max()), (int(ages.min()), int(ages.max())))
+        )
+        n = st.number_input("מספר שחקנים להצגה:", min_value=1, max_value=200, value=20, step=1)
+    manual_market_value = st.number_input(
+        "שווי שוק ידני לכל המועמדים (מיליוני אירו, 0 = ללא):", min_value=0.0, step=1.0, format="%.1f"
+    )
+
+    result = top_players_for_club(
+        players_df,
+        club_row,
+        n=int(n),
+        positions=positions,
+        min_age=min_age,
+        max_age=max_age,
+        leagues=leagues,
+        manual_market_value=manual_market_value or None,
+    )
+    if result.empty:
+        st.warning("לא נמצאו שחקנים העונים על הסינון.")
+        return
+
+    columns = ["Player", "Pos", "Age", "Comp", "Min", "Fit_Score", "YSP_Weighted"]
+    st.dataframe(result[columns])
+    csv = result[columns].to_csv(index=False).encode('utf-8')
+    st.download_button("📥 הורד את רשימת השחקנים כ־CSV", data=csv, file_name=f"{selected_club}_best_players.csv", mime='text/csv')
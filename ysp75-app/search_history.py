@@ -1,53 +1,245 @@
-import streamlit as st
 import os
+import sqlite3
+import atexit
+import logging
+import queue
+import threading
+import time
+import uuid
 import pandas as pd
 import datetime
+from contextlib import closing
 
 DATA_DIR = "ysp75-app"
+SEARCH_HISTORY_DB = os.path.join(DATA_DIR, "search_history.db")
+# קובץ ההיסטוריה הישן - מועבר פעם אחת למסד הנתונים ואז משנה שם ל-.migrated
 SEARCH_HISTORY_FILE = os.path.join(DATA_DIR, "search_history.csv")
 
-def ensure_search_history_file():
+# חיפוש זהה (סשן, שחקן, ציון) נרשם פעם אחת בלבד בתוך החלון הזה, גם אם Streamlit מריץ את הסקריפט שוב
+SEARCH_LOG_WINDOW_SECONDS = float(os.getenv("SEARCH_LOG_WINDOW_SECONDS", "900"))
+# זמן המתנה מקסימלי לאיסוף חיפושים לכתיבה אחת ברקע
+SEARCH_LOG_FLUSH_SECONDS = float(os.getenv("SEARCH_LOG_FLUSH_SECONDS", "2"))
+
+_store_ready = False
+
+_recent_searches = {}
+_recent_lock = threading.Lock()
+_pending_searches = queue.Queue()
+_writer_thread = None
+_writer_lock = threading.Lock()
+
+def get_connection():
+    # WAL מאפשר לכמה סשנים/תהליכים לכתוב במקביל בלי לדרוס זה את זה; timeout ממתין לנעילה במקום להיכשל
+    conn = sqlite3.connect(SEARCH_HISTORY_DB, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+def migrate_csv_history(conn):
     if not os.path.exists(SEARCH_HISTORY_FILE):
-        df = pd.DataFrame(columns=["Player", "YSP_Score", "Timestamp"])
-        df.to_csv(SEARCH_HISTORY_FILE, index=False)
-    else:
-        df = pd.read_csv(SEARCH_HISTORY_FILE)
-        required_cols = {"Player", "YSP_Score", "Timestamp"}
-        existing_cols = set(df.columns)
-        missing = required_cols - existing_cols
-        if missing:
-            for col in missing:
-                df[col] = ""
-            df.to_csv(SEARCH_HISTORY_FILE, index=False)
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        migrated = conn.execute("SELECT value FROM meta WHERE key = 'csv_migrated'").fetchone()
+        if migrated is None:
+            legacy_df = pd.read_csv(SEARCH_HISTORY_FILE)
+            for col in ["Player", "YSP_Score", "Timestamp"]:
+                if col not in legacy_df.columns:
+                    legacy_df[col] = None
+            legacy_df = legacy_df.dropna(subset=["Player"])
+            conn.executemany(
+                "INSERT INTO searches (player, ysp_score, timestamp) VALUES (?, ?, ?)",
+                [
+                    (str(player), None if pd.isna(score) else float(score), "" if pd.isna(ts) else str(ts))
+                    for player, score, ts in legacy_df[["Player", "YSP_Score", "Timestamp"]].itertuples(index=False)
+                ],
+            )
+            conn.execute("INSERT INTO meta (key, value) VALUES ('csv_migrated', ?)", (SEARCH_HISTORY_FILE,))
+            conn.execute("DELETE FROM meta WHERE key = 'summary_built'")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    try:
+        os.replace(SEARCH_HISTORY_FILE, SEARCH_HISTORY_FILE + ".migrated")
+    except OSError:
+        pass
+
+def rebuild_player_summary(conn, force=False):
+    # בונה את טבלת הסיכום מכל ההיסטוריה - פעם אחת עבור מסדים שנוצרו לפני שהטבלה קיימת
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        built = conn.execute("SELECT value FROM meta WHERE key = 'summary_built'").fetchone()
+        if built is None or force:
+            conn.execute("DELETE FROM player_summary")
+            conn.execute(
+                "INSERT INTO player_summary (player, search_count, last_seen, last_ysp_score) "
+                "SELECT s.player, agg.search_count, s.timestamp, s.ysp_score "
+                "FROM (SELECT player, COUNT(*) AS search_count, MAX(id) AS last_id FROM searches GROUP BY player) AS agg "
+                "JOIN searches AS s ON s.id = agg.last_id"
+            )
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('summary_built', '1')")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+def ensure_search_history_store():
+    global _store_ready
+    if _store_ready:
+        return
+    with closing(get_connection()) as conn:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS searches ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "player TEXT NOT NULL, "
+            "ysp_score REAL, "
+            "timestamp TEXT NOT NULL)"
+        )
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        # טבלת סיכום לכל שחקן, מתעדכנת בזמן הכתיבה כדי שעמוד ההיסטוריה לא יסרוק את כל השורות
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS player_summary ("
+            "player TEXT PRIMARY KEY, "
+            "search_count INTEGER NOT NULL, "
+            "last_seen TEXT NOT NULL, "
+            "last_ysp_score REAL)"
+        )
+        conn.commit()
+        migrate_csv_history(conn)
+        rebuild_player_summary(conn)
+    _store_ready = True
+
+def _write_searches(entries):
+    ensure_search_history_store()
+    with closing(get_connection()) as conn:
+        with conn:
+            conn.executemany(
+                "INSERT INTO searches (player, ysp_score, timestamp) VALUES (?, ?, ?)",
+                entries,
+            )
+            conn.executemany(
+                "INSERT INTO player_summary (player, search_count, last_seen, last_ysp_score) VALUES (?, 1, ?, ?) "
+                "ON CONFLICT(player) DO UPDATE SET "
+                "search_count = search_count + 1, last_seen = excluded.last_seen, last_ysp_score = excluded.last_ysp_score",
+                [(player, ts, score) for player, score, ts in entries],
+            )
 
 def save_search(player_name, ysp_score):
     now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    new_entry = pd.DataFrame([{
-        "Player": player_name,
-        "YSP_Score": ysp_score,
-        "Timestamp": now
-    }])
+    # הוספת שורה בודדת - עלות קבועה שאינה תלויה בגודל ההיסטוריה
+    _write_searches([(player_name, float(ysp_score), now)])
 
-    ensure_search_history_file()
+def current_session_id():
+    import streamlit as st
 
-    history_df = pd.read_csv(SEARCH_HISTORY_FILE)
-    history_df = pd.concat([history_df, new_entry], ignore_index=True)
-    history_df.to_csv(SEARCH_HISTORY_FILE, index=False)
+    if "search_session_id" not in st.session_state:
+        st.session_state["search_session_id"] = uuid.uuid4().hex
+    return st.session_state["search_session_id"]
 
-def show_search_history():
-    st.title("היסטוריית חיפושי שחקנים")
+def _drain_pending(first=None, wait=0.0):
+    batch = [] if first is None else [first]
+    deadline = time.monotonic() + wait
+    while True:
+        remaining = deadline - time.monotonic()
+        try:
+            if remaining > 0:
+                batch.append(_pending_searches.get(timeout=remaining))
+            else:
+                batch.append(_pending_searches.get_nowait())
+        except queue.Empty:
+            return batch
 
-    if os.path.exists(SEARCH_HISTORY_FILE):
-        history_df = pd.read_csv(SEARCH_HISTORY_FILE)
+def _writer_loop():
+    while True:
+        batch = _drain_pending(_pending_searches.get(), SEARCH_LOG_FLUSH_SECONDS)
+        try:
+            _write_searches(batch)
+        except Exception:
+            logging.getLogger(__name__).exception("failed to write %d searches", len(batch))
+        finally:
+            for _ in batch:
+                _pending_searches.task_done()
 
-        counts = history_df.groupby(["Player", "YSP_Score"]).size().reset_index(name="מספר חיפושים")
-        counts = counts.sort_values(by="מספר חיפושים", ascending=False)
+def _ensure_writer():
+    global _writer_thread
+    with _writer_lock:
+        if _writer_thread is None or not _writer_thread.is_alive():
+            _writer_thread = threading.Thread(target=_writer_loop, name="search-history-writer", daemon=True)
+            _writer_thread.start()
+
+def flush_search_log():
+    # כותב מיד את כל מה שממתין בתור וממתין למנה שהכותב ברקע כבר אסף (נקרא גם ביציאה מהתהליך)
+    batch = _drain_pending()
+    try:
+        if batch:
+            _write_searches(batch)
+    finally:
+        for _ in batch:
+            _pending_searches.task_done()
+    _pending_searches.join()
+
+atexit.register(flush_search_log)
+
+def log_search(player_name, ysp_score, session_id=None):
+    # רישום חיפוש מתוך מסלול הרינדור: מסנן כפילויות של אותו סשן וכותב ברקע במנות
+    ysp_score = float(ysp_score)
+    key = (session_id, player_name, round(ysp_score, 2))
+    now = time.monotonic()
+    with _recent_lock:
+        last_logged = _recent_searches.get(key)
+        if last_logged is not None and now - last_logged < SEARCH_LOG_WINDOW_SECONDS:
+            return False
+        _recent_searches[key] = now
+        if len(_recent_searches) > 10000:
+            for stale_key in [k for k, t in _recent_searches.items() if now - t >= SEARCH_LOG_WINDOW_SECONDS]:
+                del _recent_searches[stale_key]
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    _pending_searches.put((player_name, ysp_score, timestamp))
+    _ensure_writer()
+    return True
+
+def load_player_summary():
+    ensure_search_history_store()
+    with closing(get_connection()) as conn:
+        return pd.read_sql_query(
+            "SELECT player AS Player, search_count AS \"מספר חיפושים\", last_seen AS \"חיפוש אחרון\", "
+            "last_ysp_score AS \"YSP משוקלל אחרון\" FROM player_summary ORDER BY search_count DESC, last_seen DESC",
+            conn,
+        )
+
+def count_searches():
+    ensure_search_history_store()
+    with closing(get_connection()) as conn:
+        return conn.execute("SELECT COUNT(*) FROM searches").fetchone()[0]
+
+def load_search_history_page(page, page_size=100):
+    # עמוד אחד מההיסטוריה המלאה, מהחדש לישן
+    ensure_search_history_store()
+    with closing(get_connection()) as conn:
+        return pd.read_sql_query(
+            "SELECT player AS Player, ysp_score AS YSP_Score, timestamp AS Timestamp FROM searches "
+            "ORDER BY id DESC LIMIT ? OFFSET ?",
+            conn,
+            params=(page_size, page * page_size),
+        )
+
+def show_search_history():
+    import streamlit as st
+
+    st.title("היסטוריית חיפושי שחקנים")
 
-        st.subheader("מספר חיפושים לפי שחקן וציוני YSP")
-        st.dataframe(counts)
+    summary_df = load_player_summary()
+    if not summary_df.empty:
+        st.subheader("מספר חיפושים לפי שחקן וציון YSP אחרון")
+        st.dataframe(summary_df)
 
         if st.checkbox("הצג טבלת היסטוריה מפורטת"):
             st.subheader("טבלת חיפושים מלאה")
-            st.dataframe(history_df)
+            page_size = 100
+            total = count_searches()
+            pages = max(1, (total + page_size - 1) // page_size)
+            page = st.number_input(f"עמוד (מתוך {pages})", min_value=1, max_value=pages, value=1, step=1)
+            st.dataframe(load_search_history_page(int(page) - 1, page_size))
     else:
         st.info("טרם קיימת היסטוריית חיפושים לשמירה.")
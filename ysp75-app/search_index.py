@@ -0,0 +1,123 @@
+import bisect
+import heapq
+import unicodedata
+import numpy as np
+
+NGRAM_SIZE = 3
+# בבניית האינדקס: מספר השמות שה-trigrams שלהם מוחזקים כמחרוזות בבת אחת (חוסם את שיא הזיכרון)
+BUILD_CHUNK_SIZE = 8192
+_NO_POSTINGS = np.empty(0, dtype=np.int32)
+WORD_SEPARATORS = " -"
+
+def fold_text(text):
+    # אותיות קטנות והסרת סימני ניקוד/אקסנטים: "Fer López" -> "fer lopez"
+    text = str(text)
+    if text.isascii():
+        return text.casefold().strip()
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold().strip()
+
+def _ngrams(text, n):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+def _word_starts(text):
+    return [i for i in range(1, len(text)) if text[i - 1] in WORD_SEPARATORS and text[i] not in WORD_SEPARATORS]
+
+def _sorted_keys(keys, ids):
+    # מיון יציב (שוויון נשבר לפי סדר המזהים) - אותו סדר כמו מיון tuples של (מפתח, מזהה)
+    order = np.argsort(np.array(keys, dtype=str), kind="stable")
+    return [keys[i] for i in order.tolist()], np.asarray(ids, dtype=np.int32)[order]
+
+class NameIndex:
+    # אינדקס n-gram לשמות: שאילתת תת-מחרוזת נענית מחיתוך רשימות ולא מסריקת כל הטבלה.
+    # שמות כפולים מאוחדים לרשומה אחת, לפי סדר ההופעה הראשונה.
+    def __init__(self, names):
+        if hasattr(names, "tolist"):
+            # Series/מערך: המרה אחת לרשימה במקום איטרציה איבר-איבר
+            names = names.tolist()
+        self.names = list(dict.fromkeys(map(str, names)))
+        self.folded = [fold_text(name) for name in self.names]
+        # ה-trigrams של כל השמות נשמרים כמערך int32 אחד, ממוין לפי trigram ואז לפי מזהה השם; כל trigram מצביע
+        # על פרוסה ממנו (view, בלי העתקה). אין רשימות לאותיות בודדות ולזוגות: שאילתה קצרה עם limit נענית
+        # מהרשימות הממוינות, ובלי limit בסריקה של השמות. המחרוזות הזמניות נבנות במנות של BUILD_CHUNK_SIZE שמות
+        gram_codes = {}
+        chunks = []
+        for start in range(0, len(self.folded), BUILD_CHUNK_SIZE):
+            grams = [
+                folded[i:i + NGRAM_SIZE]
+                for folded in self.folded[start:start + BUILD_CHUNK_SIZE]
+                for i in range(len(folded) - NGRAM_SIZE + 1)
+            ]
+            for gram in dict.fromkeys(grams):
+                gram_codes.setdefault(gram, len(gram_codes))
+            chunks.append(np.fromiter(map(gram_codes.__getitem__, grams), dtype=np.int32, count=len(grams)))
+        codes = np.concatenate(chunks) if chunks else _NO_POSTINGS
+        counts = np.fromiter((max(len(folded) - NGRAM_SIZE + 1, 0) for folded in self.folded), dtype=np.int64, count=len(self.folded))
+        order = np.argsort(codes, kind="stable")
+        codes = codes[order]
+        posting_ids = np.repeat(np.arange(len(self.folded), dtype=np.int32), counts)[order]
+        # trigram שחוזר באותו שם ("aaaa") מופיע פעמיים ברצף - נשארת רשומה אחת
+        unique = np.ones(len(codes), dtype=bool)
+        unique[1:] = (codes[1:] != codes[:-1]) | (posting_ids[1:] != posting_ids[:-1])
+        codes, posting_ids = codes[unique], posting_ids[unique]
+        bounds = np.searchsorted(codes, np.arange(len(gram_codes) + 1))
+        self._postings = {gram: posting_ids[bounds[code]:bounds[code + 1]] for gram, code in gram_codes.items()}
+        # רשימות ממוינות לחיפוש תחילית ב-bisect: שם מלא, ומכל תחילת מילה (לא ראשונה) עד סוף השם
+        self._full_keys, self._full_ids = _sorted_keys(self.folded, range(len(self.folded)))
+        words = [(folded[start:], name_id) for name_id, folded in enumerate(self.folded) for start in _word_starts(folded)]
+        self._word_keys, self._word_ids = _sorted_keys([key for key, _ in words], [name_id for _, name_id in words])
+
+    def __len__(self):
+        return len(self.names)
+
+    def _candidates(self, query):
+        if len(query) < NGRAM_SIZE:
+            return {name_id for name_id, folded in enumerate(self.folded) if query in folded}
+        postings = sorted((self._postings.get(gram, _NO_POSTINGS) for gram in _ngrams(query, NGRAM_SIZE)), key=len)
+        candidates = postings[0]
+        for posting in postings[1:]:
+            candidates = np.intersect1d(candidates, posting, assume_unique=True)
+            if not len(candidates):
+                break
+        # החיתוך מבטיח רק שכל ה-trigrams קיימים, לכן מאמתים שהמחרוזת מופיעה ברצף
+        return {name_id for name_id in candidates.tolist() if query in self.folded[name_id]}
+
+    def _prefix_ids(self, keys, ids, query):
+        start = bisect.bisect_left(keys, query)
+        end = bisect.bisect_left(keys, query + "\U0010ffff", lo=start)
+        return ids[start:end].tolist()
+
+    def _rank(self, name_id, query):
+        folded = self.folded[name_id]
+        position = folded.find(query)
+        if folded == query:
+            tier = 0
+        elif position == 0:
+            tier = 1
+        elif any(folded.startswith(query, start) for start in _word_starts(folded)):
+            tier = 2
+        else:
+            tier = 3
+        return (tier, position, len(folded), folded)
+
+    def search(self, query, limit=None):
+        # מחזיר שמות שמכילים את השאילתה, מדורגים: התאמה מלאה, תחילת שם, תחילת מילה, ואז כל השאר
+        query = fold_text(query)
+        if not query:
+            return []
+        rank = lambda name_id: self._rank(name_id, query)
+        if limit is None:
+            return [self.names[name_id] for name_id in sorted(self._candidates(query), key=rank)]
+
+        # עם limit: הדרגות הראשונות נשלפות מהרשימות הממוינות, והסריקה המלאה של המועמדים
+        # נדרשת רק אם עדיין חסרות תוצאות - כך גם שאילתת אות אחת במאגר ענק נשארת מהירה
+        ranked = heapq.nsmallest(limit, self._prefix_ids(self._full_keys, self._full_ids, query), key=rank)
+        seen = set(ranked)
+        if len(ranked) < limit:
+            word_matches = set(self._prefix_ids(self._word_keys, self._word_ids, query)) - seen
+            more = heapq.nsmallest(limit - len(ranked), word_matches, key=rank)
+            ranked += more
+            seen.update(more)
+        if len(ranked) < limit:
+            ranked += heapq.nsmallest(limit - len(ranked), self._candidates(query) - seen, key=rank)
+        return [self.names[name_id] for name_id in ranked]
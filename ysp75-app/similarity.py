@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+from scouting import filter_players, selected_age_bounds
+
+# מאפייני הדמיון: שיעורים ל-90 דקות, מנורמלים (z-score) בתוך קבוצת העמדה ואז לאורך יחידה,
+# כך שמכפלה סקלרית בין שני שחקנים היא דמיון קוסינוס של "הפרופיל הסטטיסטי" שלהם ביחס לעמדה
+SIMILARITY_FEATURES = ["Gls", "Ast", "Tkl", "Int", "Clr", "Blocks", "Succ", "Carries", "KP", "xG", "xAG"]
+# ממוצע וסטיית התקן של קבוצה נקבעים רק משחקנים עם מספיק דקות - שיעורי 90 של מחליפים רועשים מדי
+MIN_MINUTES_FOR_STATS = 450
+# חיפוש בבלוקים של שורות: זיכרון העבודה חסום גם במאגר של מאות אלפי שחקנים
+SEARCH_BLOCK_SIZE = 65536
+
+def position_groups(players_df):
+    # העמדה הראשונה ברשימה ("DF,MF" -> "DF")
+    return players_df["Pos"].astype(str).str.split(",").str[0].str.strip().to_numpy(dtype=object)
+
+def per90_features(players_df):
+    minutes = players_df["Min"].to_numpy(dtype=np.float64)
+    safe_minutes = np.where(minutes > 0, minutes, 1)
+    columns = []
+    for col in SIMILARITY_FEATURES:
+        if f"{col}_p90" in players_df.columns:
+            columns.append(players_df[f"{col}_p90"].to_numpy(dtype=np.float64))
+        elif col in players_df.columns:
+            values = players_df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+            columns.append(np.where(minutes > 0, values / safe_minutes * 90, 0.0))
+        else:
+            columns.append(np.zeros(len(players_df)))
+    return np.nan_to_num(np.column_stack(columns))
+
+def feature_matrix(players_df):
+    features = per90_features(players_df)
+    groups = position_groups(players_df)
+    minutes = players_df["Min"].to_numpy(dtype=np.float64)
+    normalized = np.zeros_like(features)
+    for group in pd.unique(groups):
+        rows = groups == group
+        reference = rows & (minutes >= MIN_MINUTES_FOR_STATS)
+        if not reference.any():
+            reference = rows
+        mean = features[reference].mean(axis=0)
+        std = features[reference].std(axis=0)
+        normalized[rows] = (features[rows] - mean) / np.where(std > 0, std, 1)
+    norms = np.linalg.norm(normalized, axis=1, keepdims=True)
+    return (normalized / np.where(norms > 0, norms, 1)).astype(np.float32), groups
+
+class SimilarityIndex:
+    # מטריצת המאפיינים נבנית פעם אחת; שאילתה היא מכפלת מטריצה-וקטור לכל בלוק ו-argpartition ל-k המובילים
+    def __init__(self, players_df):
+        self.players = players_df
+        self.vectors, self.groups = feature_matrix(players_df)
+        self._positions = {key: position for position, key in enumerate(players_df.index)}
+
+    def __len__(self):
+        return len(self.players)
+
+    def similar_to(self, player_key, k=10, same_position=True, min_age=None, max_age=None, leagues=None, min_minutes=None):
+        position = self._positions.get(player_key)
+        if position is None:
+            return self.players.iloc[[]].assign(Similarity=pd.Series(dtype=float))
+        mask = filter_players(self.players, None, min_age, max_age, leagues, min_minutes)
+        if same_position:
+            mask &= self.groups == self.groups[position]
+        mask[position] = False
+
+        query = self.vectors[position]
+        best_rows = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        for start in range(0, len(self.vectors), SEARCH_BLOCK_SIZE):
+            block_mask = mask[start:start + SEARCH_BLOCK_SIZE]
+            if not block_mask.any():
+                continue
+            rows = start + np.flatnonzero(block_mask)
+            scores = self.vectors[rows] @ query
+            if len(scores) > k:
+                top = np.argpartition(-scores, k - 1)[:k]
+                rows, scores = rows[top], scores[top]
+            best_rows = np.concatenate([best_rows, rows])
+            best_scores = np.concatenate([best_scores, scores])
+            if len(best_scores) > k:
+                top = np.argpartition(-best_scores, k - 1)[:k]
+                best_rows, best_scores = best_rows[top], best_scores[top]
+
+        order = np.lexsort((best_rows, -best_scores))
+        result = self.players.iloc[best_rows[order]].copy()
+        result["Similarity"] = np.round(best_scores[order].astype(np.float64), 3)
+        return result
+
+def show_similar_players(index, player_key):
+    # streamlit נטען רק כאן, כך ש-SimilarityIndex זמין ל-batch ול-benchmarks בלי לטעון אותו;
+    # האפליקציה עוטפת את הפונקציה ב-fragment
+    import streamlit as st
+
+    st.markdown("---")
+    st.subheader("👥 שחקנים דומים")
+    players = index.players
+
+    col1, col2 = st.columns(2)
+    with col1:
+        k = st.number_input("מספר שחקנים:", min_value=1, max_value=50, value=10, step=1, key="similar_k")
+        same_position = st.checkbox("רק מאותה עמדה", value=True, key="similar_same_position")
+        leagues = st.multiselect("ליגות:", sorted(players["Comp"].dropna().astype(str).unique()), default=[], key="similar_leagues")
+    with col2:
+        ages = players["Age"].dropna()
+        min_age, max_age = selected_age_bounds(
+            ages, st.slider("טווח גילאים:", int(ages.min()), int(ages.max()), (int(ages.min()), int(ages.max())), key="similar_ages")
+        )
+        min_minutes = st.number_input("מינימום דקות:", min_value=0, value=MIN_MINUTES_FOR_STATS, step=90, key="similar_min_minutes")
+
+    result = index.similar_to(
+        player_key,
+        k=int(k),
+        same_position=same_position,
+        min_age=min_age,
+        max_age=max_age,
+        leagues=leagues,
+        min_minutes=min_minutes,
+    )
+    if result.empty:
+        st.warning("לא נמצאו שחקנים דומים העונים על הסינון.")
+        return
+    st.dataframe(result[["Player", "Pos", "Age", "Leagues", "Min", "YSP_Gross", "Similarity"]], hide_index=True)
@@ -0,0 +1,172 @@
+import os
+import sqlite3
+import time
+import argparse
+import threading
+import urllib.parse
+from functools import partial
+from contextlib import closing
+from concurrent.futures import Future, ThreadPoolExecutor
+import requests
+from bs4 import BeautifulSoup
+from players_data import RateLimiter
+
+DATA_DIR = "ysp75-app"
+LINK_CACHE_DB = os.path.join(DATA_DIR, "transfermarkt_links.db")
+PLAYERS_CSV = os.path.join(DATA_DIR, "players_simplified_2025.csv")
+
+# קישור שנמצא נשמר לזמן ארוך; "לא נמצא" נשמר לזמן קצר יותר כדי לנסות שוב בהמשך
+LINK_TTL_SECONDS = float(os.getenv("TRANSFERMARKT_LINK_TTL_SECONDS", str(30 * 24 * 3600)))
+NEGATIVE_TTL_SECONDS = float(os.getenv("TRANSFERMARKT_NEGATIVE_TTL_SECONDS", str(24 * 3600)))
+# (חיבור, קריאה) בשניות - מנוע חיפוש איטי לא יתקע את רינדור הדף
+REQUEST_TIMEOUT = (3.05, 5)
+# מספר חיפושי קישור מקביליים לכל התהליך (משותף לכל הסשנים)
+MAX_CONCURRENT_LOOKUPS = int(os.getenv("TRANSFERMARKT_MAX_CONCURRENT_LOOKUPS", "4"))
+# קצב החיפושים בחימום המטמון (לכל הריצה, לא לכל worker) - DuckDuckGo חוסם/מחזיר 202 בקצב גבוה
+WARM_REQUESTS_PER_MINUTE = float(os.getenv("TRANSFERMARKT_WARM_REQUESTS_PER_MINUTE", "30"))
+
+_session = None
+_cache_ready = False
+_executor = None
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+def get_session():
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        _session.headers.update({"User-Agent": "Mozilla/5.0"})
+    return _session
+
+def get_connection():
+    conn = sqlite3.connect(LINK_CACHE_DB, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+def ensure_link_cache():
+    global _cache_ready
+    if _cache_ready:
+        return
+    with closing(get_connection()) as conn:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS links ("
+            "player TEXT PRIMARY KEY, "
+            "url TEXT, "
+            "resolved_at REAL NOT NULL)"
+        )
+        conn.commit()
+    _cache_ready = True
+
+def get_cached_link(player_name, now=None):
+    # מחזיר (נמצא_במטמון, קישור); קישור None = תוצאה שלילית שנשמרה
+    ensure_link_cache()
+    now = time.time() if now is None else now
+    with closing(get_connection()) as conn:
+        row = conn.execute("SELECT url, resolved_at FROM links WHERE player = ?", (player_name,)).fetchone()
+    if row is None:
+        return False, None
+    url, resolved_at = row
+    ttl = LINK_TTL_SECONDS if url else NEGATIVE_TTL_SECONDS
+    if now - resolved_at > ttl:
+        return False, None
+    return True, url
+
+def store_link(player_name, url):
+    ensure_link_cache()
+    with closing(get_connection()) as conn:
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO links (player, url, resolved_at) VALUES (?, ?, ?)",
+                (player_name, url, time.time()),
+            )
+
+def google_fallback_link(player_name):
+    return f"https://www.google.com/search?q=site:transfermarkt.com+{urllib.parse.quote_plus(player_name)}"
+
+def search_transfermarkt_link(player_name):
+    # חיפוש ב-DuckDuckGo; מחזיר None רק כשהחיפוש הצליח ואין תוצאה, וזורק חריגה בכל מקרה אחר.
+    # הגבלת קצב מגיעה כ-202 (או כדף ללא תוצאות וללא הודעת "אין תוצאות") - אסור שתישמר כתוצאה שלילית
+    query = f"site:transfermarkt.com {player_name}"
+    ddg_url = f"https://duckduckgo.com/html/?q={urllib.parse.quote_plus(query)}"
+    res = get_session().get(ddg_url, timeout=REQUEST_TIMEOUT)
+    if res.status_code != 200:
+        raise requests.HTTPError(f"search returned HTTP {res.status_code}", response=res)
+    soup = BeautifulSoup(res.text, 'html.parser')
+    results = soup.find_all("a", class_="result__a", href=True)
+    if not results and soup.find(class_="no-results") is None:
+        raise requests.HTTPError("search returned a page without results", response=res)
+    for a in results:
+        href = a['href']
+        if "transfermarkt.com" in href:
+            if href.startswith("/l/?kh="):
+                parsed = urllib.parse.urlparse(href)
+                q = urllib.parse.parse_qs(parsed.query).get('uddg', [None])[0]
+                if q:
+                    return q
+            else:
+                return href
+    return None
+
+def resolve_transfermarkt_link(player_name, use_cache=True, rate_limiter=None):
+    if use_cache:
+        hit, url = get_cached_link(player_name)
+        if hit:
+            return url or google_fallback_link(player_name)
+    if rate_limiter is not None:
+        rate_limiter.wait()
+    try:
+        url = search_transfermarkt_link(player_name)
+    except Exception:
+        # שגיאת רשת אינה נשמרת במטמון - ננסה שוב בצפייה הבאה
+        return google_fallback_link(player_name)
+    store_link(player_name, url)
+    return url or google_fallback_link(player_name)
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_LOOKUPS, thread_name_prefix="transfermarkt")
+    return _executor
+
+def _forget_inflight(player_name):
+    with _inflight_lock:
+        _inflight.pop(player_name, None)
+
+def resolve_transfermarkt_link_async(player_name):
+    # מחזיר Future: מיד אם הקישור במטמון, אחרת החיפוש רץ ברקע מחוץ למסלול הרינדור.
+    # בקשות במקביל לאותו שחקן חולקות חיפוש אחד.
+    hit, url = get_cached_link(player_name)
+    if hit:
+        future = Future()
+        future.set_result(url or google_fallback_link(player_name))
+        return future
+    with _inflight_lock:
+        future = _inflight.get(player_name)
+        if future is not None:
+            return future
+        future = _get_executor().submit(resolve_transfermarkt_link, player_name, False)
+        _inflight[player_name] = future
+    future.add_done_callback(lambda _: _forget_inflight(player_name))
+    return future
+
+def warm_link_cache(player_names, workers=4, requests_per_minute=WARM_REQUESTS_PER_MINUTE):
+    # פתרון מראש של קישורים לכל השחקנים שאין להם רשומה תקפה במטמון
+    pending = [name for name in dict.fromkeys(player_names) if not get_cached_link(name)[0]]
+    resolve = partial(resolve_transfermarkt_link, rate_limiter=RateLimiter(requests_per_minute))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for done, _ in enumerate(executor.map(resolve, pending), start=1):
+            if done % 50 == 0 or done == len(pending):
+                print(f"{done}/{len(pending)} links resolved")
+    return len(pending)
+
+if __name__ == "__main__":
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Pre-resolve Transfermarkt links into the on-disk cache.")
+    parser.add_argument("--csv", default=PLAYERS_CSV, help="players CSV with a Player column")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests-per-minute", type=float, default=WARM_REQUESTS_PER_MINUTE)
+    args = parser.parse_args()
+
+    names = pd.read_csv(args.csv)["Player"].dropna().astype(str).str.strip()
+    warm_link_cache(names, workers=args.workers, requests_per_minute=args.requests_per_minute)